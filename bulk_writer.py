@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import httpx
+
+from json_records import encode_records
+
+
+# Completed batch ranges of unfinished uploads, so a rerun after a crash resumes
+UPLOAD_CHECKPOINT_DIR = os.getenv("UPLOAD_CHECKPOINT_DIR", ".cache/uploads")
+# Checkpoints older than this belong to batches that will never be uploaded again
+CHECKPOINT_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+# Status codes worth retrying; 413 shrinks the batch instead
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Column holding the hash of a row's business columns, and keys per existing-hash lookup
+CONTENT_HASH_COLUMN = "content_hash"
+HASH_LOOKUP_CHUNK_SIZE = 50
+
+
+class BulkWriter:
+    """
+    Upserts records into a Supabase table through the PostgREST endpoint, several batches
+    at a time over one pooled HTTP client.
+
+    The batch size adapts as it goes: it grows while batches come back faster than
+    target_latency, shrinks when they are slower, and halves when the server rejects a
+    payload as too large. Failed batches are retried with jittered exponential backoff.
+    Every completed row range is checkpointed, and an upload of the same records that
+    crashed part way skips the ranges already written.
+    """
+
+    def __init__(self, url: str, key: str, max_workers: int = 4, batch_size: int = 500,
+                 min_batch_size: int = 10, max_batch_size: int = 5000, target_latency: float = 2.0,
+                 retries: int = 4, base_delay: float = 1.0, timeout: float = 60.0,
+                 checkpoint_dir: str = UPLOAD_CHECKPOINT_DIR):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.retries = retries
+        self.base_delay = base_delay
+        self.checkpoint_dir = checkpoint_dir
+        self.client = httpx.Client(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_workers, max_keepalive_connections=max_workers),
+        )
+
+    def close(self):
+        self.client.close()
+
+    def upsert(self, table: str, records: list, on_conflict: str = None) -> dict:
+        """Upsert JSON-ready records; returns upload stats and raises if any batch still failed"""
+        started = time.perf_counter()
+        checkpoint_path = self._checkpoint_path(table, on_conflict, records)
+        done = self._load_checkpoint(checkpoint_path)
+        resumed = sum(end - start for start, end in done)
+        if resumed:
+            print(f"Resuming upload to {table}: {resumed} of {len(records)} records already written")
+
+        pending = _missing_ranges(done, len(records))
+        stats = {"records": len(records), "resumed": resumed, "written": 0, "batches": 0, "retries": 0, "failed": 0}
+        failures = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                # Keep every worker busy, cutting batches at the current size
+                while pending and len(running) < self.max_workers:
+                    start, end = pending.pop(0)
+                    stop = min(end, start + self.batch_size)
+                    if stop < end:
+                        pending.insert(0, (stop, end))
+                    future = executor.submit(self._send, table, on_conflict, records[start:stop])
+                    running[future] = (start, stop)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    start, stop = running.pop(future)
+                    outcome, latency, retries, error = future.result()
+                    stats["retries"] += retries
+                    if outcome == "ok":
+                        stats["batches"] += 1
+                        stats["written"] += stop - start
+                        done.append((start, stop))
+                        self._save_checkpoint(checkpoint_path, done)
+                        self._adapt(latency, stop - start)
+                        print(f"  Uploaded records {start}-{stop - 1} to {table} in {latency:.2f}s")
+                    elif outcome == "too_large" and stop - start > self.min_batch_size:
+                        # Retry the same rows in smaller batches
+                        self.batch_size = max(self.min_batch_size, (stop - start) // 2)
+                        pending.insert(0, (start, stop))
+                        print(f"  Payload too large for {stop - start} records; batch size now {self.batch_size}")
+                    else:
+                        stats["failed"] += 1
+                        failures.append((start, stop, error))
+                        print(f"  Failed to upload records {start}-{stop - 1} to {table}: {error}")
+
+        stats["batch_size"] = self.batch_size
+        stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+        print(f"Upload to {table}: {stats['written']} records in {stats['batches']} batches, "
+              f"{stats['retries']} retries, final batch size {self.batch_size}, {stats['elapsed_s']}s")
+
+        if failures:
+            raise RuntimeError(f"{len(failures)} batches failed to upload to {table}; "
+                               f"rerun to resume from {checkpoint_path}")
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return stats
+
+    def upsert_changed(self, table: str, records: list, key_column: str, on_conflict: str = None,
+                       volatile_columns=("ingestion_date",)) -> dict:
+        """
+        Upsert only the records that are new or whose business columns changed. Each record
+        gets a content_hash over every column except volatile_columns; records whose key
+        already has the same hash in the table are not re-sent, only their volatile columns
+        are refreshed with a bulk PATCH. Returns the skip/insert/update counts.
+        """
+        started = time.perf_counter()
+        for record in records:
+            record[CONTENT_HASH_COLUMN] = content_hash(record, volatile_columns)
+
+        try:
+            existing = self.fetch_hashes(table, key_column, [record[key_column] for record in records])
+        except httpx.HTTPError as e:
+            # No content_hash column yet, or the lookup failed; write everything as before
+            print(f"Could not read {CONTENT_HASH_COLUMN} from {table} ({e}); upserting all {len(records)} records")
+            for record in records:
+                record.pop(CONTENT_HASH_COLUMN)
+            return self.upsert(table, records, on_conflict)
+
+        changed = []
+        unchanged = []
+        counts = {"skipped": 0, "inserted": 0, "updated": 0}
+        for record in records:
+            stored = existing.get(record[key_column], _MISSING)
+            if stored is _MISSING:
+                counts["inserted"] += 1
+                changed.append(record)
+            elif stored != record[CONTENT_HASH_COLUMN]:
+                counts["updated"] += 1
+                changed.append(record)
+            else:
+                counts["skipped"] += 1
+                unchanged.append(record)
+        print(f"Change detection for {table} ({time.perf_counter() - started:.2f}s): "
+              f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} unchanged skipped")
+
+        stats = self.upsert(table, changed, on_conflict) if changed else {}
+        self.refresh_columns(table, unchanged, key_column, volatile_columns)
+        stats.update(counts)
+        return stats
+
+    def refresh_columns(self, table: str, records: list, key_column: str, columns) -> None:
+        """PATCH just the given columns of existing rows, one request per chunk of keys sharing the same values"""
+        groups = {}
+        for record in records:
+            values = tuple((column, record[column]) for column in columns if column in record)
+            if values:
+                groups.setdefault(values, []).append(record[key_column])
+        requests = [(dict(values), keys[i:i + HASH_LOOKUP_CHUNK_SIZE])
+                    for values, keys in groups.items() for i in range(0, len(keys), HASH_LOOKUP_CHUNK_SIZE)]
+        if not requests:
+            return
+
+        def patch(request):
+            values, keys = request
+            body = json.dumps(values, separators=(",", ":")).encode("utf-8")
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self.base_delay * 2 ** (attempt - 1) * (1 + random.random()))
+                try:
+                    response = self.client.patch(f"/{table}", content=body, params={key_column: _in_filter(keys)},
+                                                 headers={"Prefer": "return=minimal"})
+                except httpx.TransportError:
+                    continue
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return
+            raise RuntimeError(f"Could not refresh {', '.join(values)} of {len(keys)} rows in {table}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(patch, requests))
+        print(f"Refreshed {', '.join(columns)} of {len(records)} unchanged rows in {table} "
+              f"with {len(requests)} requests ({time.perf_counter() - started:.2f}s)")
+
+    def fetch_hashes(self, table: str, key_column: str, keys: list) -> dict:
+        """{key: content_hash} for the keys already in the table, looked up in concurrent chunks"""
+        keys = list(dict.fromkeys(key for key in keys if key is not None))
+        chunks = [keys[i:i + HASH_LOOKUP_CHUNK_SIZE] for i in range(0, len(keys), HASH_LOOKUP_CHUNK_SIZE)]
+
+        def fetch(chunk):
+            response = self.client.get(f"/{table}", params={
+                "select": f"{key_column},{CONTENT_HASH_COLUMN}",
+                key_column: _in_filter(chunk),
+            })
+            response.raise_for_status()
+            return response.json()
+
+        hashes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for rows in executor.map(fetch, chunks):
+                hashes.update((row[key_column], row[CONTENT_HASH_COLUMN]) for row in rows)
+        return hashes
+
+    def _send(self, table: str, on_conflict: str, batch: list):
+        # Returns (outcome, latency, retries, error) with outcome "ok", "too_large" or "failed"
+        body = encode_records(batch)
+        params = {"on_conflict": on_conflict} if on_conflict else None
+        headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.base_delay * 2 ** (attempt - 1) * (1 + random.random()))
+            started = time.perf_counter()
+            try:
+                response = self.client.post(f"/{table}", content=body, params=params, headers=headers)
+            except httpx.TransportError as e:
+                error = e
+                continue
+            latency = time.perf_counter() - started
+            if response.status_code == 413:
+                return "too_large", latency, attempt, response.text
+            if response.status_code in RETRY_STATUS_CODES:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                continue
+            if response.is_error:
+                return "failed", latency, attempt, f"HTTP {response.status_code}: {response.text[:200]}"
+            return "ok", latency, attempt, None
+        return "failed", 0.0, self.retries, error
+
+    def _adapt(self, latency: float, size: int):
+        # Grow while full batches come back well under the target latency, back off when slower
+        if latency < self.target_latency / 2 and size >= self.batch_size:
+            self.batch_size = min(self.max_batch_size, int(self.batch_size * 1.5))
+        elif latency > self.target_latency:
+            self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.7))
+
+    def _checkpoint_path(self, table: str, on_conflict: str, records: list) -> str:
+        # Keyed by the exact payload, so only a rerun with the same records resumes
+        digest = hashlib.sha256(f"{table}\0{on_conflict}\0".encode("utf-8"))
+        digest.update(json.dumps(records, sort_keys=True, default=str).encode("utf-8"))
+        return os.path.join(self.checkpoint_dir, f"{table}-{digest.hexdigest()[:16]}.json")
+
+    def _load_checkpoint(self, path: str) -> list:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        now = time.time()
+        for name in os.listdir(self.checkpoint_dir):
+            other = os.path.join(self.checkpoint_dir, name)
+            if other != path and now - os.path.getmtime(other) > CHECKPOINT_MAX_AGE_SECONDS:
+                os.remove(other)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(done_range) for done_range in json.load(f)["done"]]
+
+    def _save_checkpoint(self, path: str, done: list):
+        # Write to a temp file and rename so a crash never leaves half a checkpoint
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"done": _merge_ranges(done)}, f)
+        os.replace(tmp_path, path)
+
+
+_MISSING = object()
+
+
+def content_hash(record: dict, volatile_columns=()) -> str:
+    """Stable hash of a JSON-ready record, ignoring volatile columns and any stored hash"""
+    content = {column: value for column, value in record.items()
+               if column not in volatile_columns and column != CONTENT_HASH_COLUMN}
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def _in_filter(values: list) -> str:
+    # PostgREST in.(...) filter; values are double-quoted so commas and parentheses survive
+    quoted = []
+    for value in values:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        quoted.append(f'"{value}"')
+    return f"in.({','.join(quoted)})"
+
+
+def _merge_ranges(ranges: list) -> list:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(done: list, total: int) -> list:
+    # Row ranges of [0, total) not covered by the completed ranges
+    missing = []
+    position = 0
+    for start, end in _merge_ranges(done):
+        if start > position:
+            missing.append((position, start))
+        position = max(position, end)
+    if position < total:
+        missing.append((position, total))
+    return missing
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_records import json_safe_records, encode_records
+
+
+def legacy_json_safe_value(value):
+    # The per-cell conversion upload_to_supabase used before json_records
+    if value is None:
+        return None
+    if isinstance(value, (list, dict, str, int, bool)):
+        return value
+    if isinstance(value, float):
+        return None if np.isnan(value) else value
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        ts = pd.Timestamp(value)
+        return None if pd.isna(ts) else ts.strftime('%Y-%m-%d')
+    if isinstance(value, (np.integer, np.floating)):
+        return None if pd.isna(value) else value.item()
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return value
+
+
+def legacy_json_safe_records(df: pd.DataFrame) -> list:
+    records = df.to_dict(orient="records")
+    for record in records:
+        for key in record:
+            record[key] = legacy_json_safe_value(record[key])
+    return records
+
+
+def make_jobs(rows: int, seed: int = 0) -> pd.DataFrame:
+    # A frame shaped like jobs_clean right before upload, with missing values in every nullable column
+    rng = np.random.default_rng(seed)
+    posted = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    salary = pd.array(rng.integers(30000, 300000, rows), dtype="Int64")
+    salary[rng.random(rows) < 0.4] = pd.NA
+    job_id = pd.array(np.arange(rows), dtype="Int64")
+    skills = [["solidity", "rust"] if i % 3 else None for i in range(rows)]
+    df = pd.DataFrame({
+        "title": [f"Senior Engineer {i % 997}" for i in range(rows)],
+        "job_function": np.where(rng.random(rows) < 0.5, "Engineering, Product, and Research", "Unknown"),
+        "company": [f"Company {i % 211}" if i % 50 else None for i in range(rows)],
+        "location": np.where(rng.random(rows) < 0.3, "Remote", "Germany"),
+        "salary_amount": salary,
+        "skills": skills,
+        "source": "web3career",
+        "job_url": [f"https://web3.career/job/{i}" for i in range(rows)],
+        "job_id": job_id,
+        "posted_date": posted.where(rng.random(rows) > 0.01),
+        "is_remote": rng.random(rows) < 0.5,
+        "ingestion_date": pd.Timestamp.now().strftime('%Y-%m-%d'),
+        "score": np.where(rng.random(rows) < 0.2, np.nan, rng.random(rows)),
+    })
+    df["my_id"] = df["posted_date"].dt.strftime('%Y-%m-%d').astype(str) + "-" + df["job_id"].astype(str)
+    return df
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark column-wise against per-cell JSON-safe record conversion')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the generated jobs frame')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation; the fastest is reported')
+    args = parser.parse_args()
+
+    df = make_jobs(args.rows)
+    assert json_safe_records(df) == legacy_json_safe_records(df), "column-wise records differ from per-cell records"
+
+    legacy = best_of(lambda: legacy_json_safe_records(df), args.repeat)
+    columnwise = best_of(lambda: json_safe_records(df), args.repeat)
+    encoded = best_of(lambda: encode_records(json_safe_records(df)), args.repeat)
+
+    print(f"Rows: {len(df)}, columns: {len(df.columns)}")
+    print(f"Per-cell (legacy):       {legacy:.3f}s")
+    print(f"Column-wise:             {columnwise:.3f}s ({legacy / columnwise:.1f}x faster)")
+    print(f"Column-wise + JSON body: {encoded:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
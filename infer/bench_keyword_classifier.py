@@ -0,0 +1,103 @@
+import argparse
+import importlib.util
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from job_function_model import clean_titles
+
+# infer-mixed.py is not importable by name, so load it from its path (it reads .env and builds clients on import)
+spec = importlib.util.spec_from_file_location("infer_mixed", os.path.join(os.path.dirname(os.path.abspath(__file__)), "infer-mixed.py"))
+infer_mixed = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(infer_mixed)
+
+
+def legacy_classify_titles(df: pd.DataFrame) -> pd.DataFrame:
+    # The per-row keyword loop at the top of infer_job_function before the precompiled patterns
+    data_keywords = set(k.lower() for k in infer_mixed.data_keywords)
+    engineering_keywords = set(k.lower() for k in infer_mixed.engineering_keywords)
+    business_keywords = set(k.lower() for k in infer_mixed.business_keywords)
+    design_keywords = set(k.lower() for k in infer_mixed.design_keywords)
+
+    df = df.copy()
+    for index, row in df.iterrows():
+        # Clean the title
+        title = row['title'].lower()
+        title = re.sub(r"\s*\(.*?\)", "", title).strip()
+        title = title.replace("(", "").replace(")", "").strip()
+        title = title.replace("/", "").strip()
+        title = title.split(",")[0]
+        title = title.split("-")[0]
+        df.loc[index, 'clean_title'] = title
+
+        # Match in priority order: Data -> Engineering -> Business -> Art
+        if any(keyword in title for keyword in data_keywords):
+            df.loc[index, 'job_function'] = "Data and Analytics"
+        elif any(keyword in title for keyword in engineering_keywords):
+            df.loc[index, 'job_function'] = "Engineering, Product, and Research"
+        elif any(keyword in title for keyword in business_keywords):
+            df.loc[index, 'job_function'] = "Business, Strategy, and Operations"
+        elif any(keyword in title for keyword in design_keywords):
+            df.loc[index, 'job_function'] = "Design, Art, and Creative"
+        else:
+            df.loc[index, 'job_function'] = "Unknown"
+    return df
+
+
+def vectorized_classify_titles(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['clean_title'] = clean_titles(df['title'])
+    df['job_function'] = infer_mixed.classify_titles_by_keywords(df['clean_title'])
+    return df
+
+
+def make_titles(rows: int, seed: int = 0) -> pd.DataFrame:
+    # Titles built from every keyword list plus unmatched words, with the punctuation the cleaning step strips
+    rng = np.random.default_rng(seed)
+    keywords = (infer_mixed.data_keywords + infer_mixed.engineering_keywords
+                + infer_mixed.business_keywords + infer_mixed.design_keywords)
+    words = keywords + ["Chief of Staff", "Head", "Lead", "Senior", "Intern", "Community", "Web3", "Protocol"]
+    suffixes = ["", " (Remote)", " (m/f/d)", ", EMEA", " - Contract", " / Part-time", " (Senior", ")", " - Berlin, DE"]
+    titles = []
+    for _ in range(rows):
+        parts = rng.choice(words, size=rng.integers(1, 4))
+        title = " ".join(parts) + rng.choice(suffixes)
+        titles.append(title.upper() if rng.random() < 0.1 else title)
+    return pd.DataFrame({"title": titles})
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Check and benchmark the vectorized keyword classifier against the per-row loop')
+    parser.add_argument('--titles', type=int, default=25000, help='Titles in the generated corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation; the fastest is reported')
+    args = parser.parse_args()
+
+    df = make_titles(args.titles)
+    legacy_df = legacy_classify_titles(df)
+    vectorized_df = vectorized_classify_titles(df)
+    assert (legacy_df['clean_title'] == vectorized_df['clean_title']).all(), "cleaned titles differ from the per-row loop"
+    assert (legacy_df['job_function'] == vectorized_df['job_function']).all(), "job functions differ from the per-row loop"
+
+    legacy = best_of(lambda: legacy_classify_titles(df), args.repeat)
+    vectorized = best_of(lambda: vectorized_classify_titles(df), args.repeat)
+
+    print(f"Titles: {len(df)}, keyword matches: {(vectorized_df['job_function'] != 'Unknown').sum()}")
+    print(f"Per-row (legacy): {legacy:.3f}s")
+    print(f"Vectorized:       {vectorized:.3f}s ({legacy / vectorized:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
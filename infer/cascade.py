@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class CascadeTier:
+    """
+    One classifier in the cascade. classify(titles) returns (labels, confidences) for a
+    Series of titles; a label is accepted when it is valid and its confidence is at least
+    min_confidence. cost_per_title is the estimated spend of sending one title to the tier.
+    """
+
+    def __init__(self, name: str, classify, min_confidence: float, cost_per_title: float = 0.0):
+        self.name = name
+        self.classify = classify
+        self.min_confidence = min_confidence
+        self.cost_per_title = cost_per_title
+
+
+def run_cascade(titles: pd.Series, tiers: list, valid_labels: list, default: str = "Unknown"):
+    """
+    Send titles through the tiers in order; each tier only sees the titles no earlier tier
+    was confident about. Titles nobody accepts keep their most confident valid guess.
+    Returns (labels, stats) where stats has one row per tier.
+    """
+    labels = pd.Series(default, index=titles.index, dtype=object)
+    best_confidence = pd.Series(0.0, index=titles.index)
+    residue = titles
+    stats = []
+
+    for tier in tiers:
+        started = time.perf_counter()
+        if len(residue) > 0:
+            tier_labels, confidences = tier.classify(residue)
+            tier_labels = pd.Series(np.asarray(tier_labels, dtype=object), index=residue.index)
+            confidences = pd.Series(np.asarray(confidences, dtype=float), index=residue.index)
+        else:
+            tier_labels = pd.Series(dtype=object)
+            confidences = pd.Series(dtype=float)
+        elapsed = time.perf_counter() - started
+
+        valid = tier_labels.isin(valid_labels)
+        accepted = valid & (confidences >= tier.min_confidence)
+
+        # Remember the best guess so far for titles that end up unresolved
+        better = valid & (confidences > best_confidence[residue.index])
+        labels[better[better].index] = tier_labels[better]
+        best_confidence[better[better].index] = confidences[better]
+        labels[accepted[accepted].index] = tier_labels[accepted]
+
+        stats.append({
+            "tier": tier.name,
+            "titles_in": len(residue),
+            "accepted": int(accepted.sum()),
+            "latency_s": round(elapsed, 3),
+            "cost_usd": round(len(residue) * tier.cost_per_title, 4),
+        })
+        residue = residue[~accepted.reindex(residue.index, fill_value=False)]
+
+    return labels, pd.DataFrame(stats)
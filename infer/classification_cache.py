@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import threading
+
+
+class ClassificationCache:
+    """
+    Persistent (normalized title, model id) -> job_function cache backed by SQLite and
+    loaded into an in-memory dict. Entries written under another model id or cache
+    version are ignored, so changing either invalidates the old answers.
+    The table and column names can be changed to cache other model answers
+    (e.g. location -> country).
+    """
+
+    def __init__(self, path: str, model: str, version: int = 1, table: str = "job_functions",
+                 key_column: str = "title", value_column: str = "job_function"):
+        self.model = model
+        self.version = version
+        self.table = table
+        self.key_column = key_column
+        self.value_column = value_column
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Inference stages may run on worker threads; writes are serialized with a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f" {key_column} TEXT NOT NULL, model TEXT NOT NULL, version INTEGER NOT NULL,"
+            f" {value_column} TEXT NOT NULL, origin TEXT,"
+            f" PRIMARY KEY ({key_column}, model, version))"
+        )
+        rows = self.conn.execute(
+            f"SELECT {key_column}, {value_column} FROM {table} WHERE model = ? AND version = ?",
+            (model, version),
+        )
+        self.labels = dict(rows)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def get_many(self, titles) -> dict:
+        """Return {title: job_function} for every title found in the cache"""
+        found = {}
+        for title in titles:
+            if title in self.labels:
+                found[title] = self.labels[title]
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def put_many(self, labels: dict, origin: str = "llm") -> None:
+        with self.lock:
+            self.labels.update(labels)
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({self.key_column}, model, version, {self.value_column}, origin)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(title, self.model, self.version, job_function, origin) for title, job_function in labels.items()],
+            )
+            self.conn.commit()
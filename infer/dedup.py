@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """L2-normalize embeddings into a float32 matrix so dot products are cosine similarities"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or len(embeddings) == 0:
+        return embeddings.reshape(len(embeddings), -1)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def blockwise_similar_pairs(a: np.ndarray, b: np.ndarray, threshold: float, tile_size: int = 1024):
+    """
+    Find all (i, j, score) with cosine(a[i], b[j]) > threshold, one tile_size x tile_size
+    block at a time. Inputs must already be normalized; peak memory is one tile, not n x m.
+    """
+    rows, cols, scores = [], [], []
+    for i0 in range(0, len(a), tile_size):
+        a_tile = a[i0:i0 + tile_size]
+        for j0 in range(0, len(b), tile_size):
+            tile = a_tile @ b[j0:j0 + tile_size].T
+            tile_rows, tile_cols = np.nonzero(tile > threshold)
+            if len(tile_rows):
+                rows.append(tile_rows + i0)
+                cols.append(tile_cols + j0)
+                scores.append(tile[tile_rows, tile_cols])
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def local_vectors(texts_per_source: list, ngram_range=(3, 5)) -> list:
+    """
+    Character n-gram TF-IDF vectors, fitted on the texts of all sources together.
+    Rows are L2-normalized sparse vectors, so dot products are cosine similarities.
+    """
+    vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=ngram_range, lowercase=True, dtype=np.float32)
+    vectorizer.fit([text for texts in texts_per_source for text in texts])
+    return [vectorizer.transform(texts).tocsr() for texts in texts_per_source]
+
+
+def sparse_similar_pairs(a, b, threshold: float, tile_size: int = 1024):
+    """blockwise_similar_pairs for normalized sparse matrices: only rows of a are tiled"""
+    b_t = b.T.tocsc()
+    rows, cols, scores = [], [], []
+    for i0 in range(0, a.shape[0], tile_size):
+        tile = sparse.coo_matrix(a[i0:i0 + tile_size] @ b_t)
+        keep = tile.data > threshold
+        rows.append(tile.row[keep].astype(np.int64) + i0)
+        cols.append(tile.col[keep].astype(np.int64))
+        scores.append(tile.data[keep].astype(np.float32))
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def _join_pair_keys(codes_a: np.ndarray, codes_b: np.ndarray) -> np.ndarray:
+    """Sort-merge join: encoded (i * len(b) + j) keys of every pair with codes_a[i] == codes_b[j]"""
+    order = np.argsort(codes_b, kind="stable")
+    sorted_b = codes_b[order]
+    left = np.searchsorted(sorted_b, codes_a, side="left")
+    counts = np.searchsorted(sorted_b, codes_a, side="right") - left
+    total = counts.sum()
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    rows = np.repeat(np.arange(len(codes_a), dtype=np.int64), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    cols = order[np.repeat(left, counts) + offsets]
+    return rows * len(codes_b) + cols
+
+
+def _unique_pairs(pair_keys: list, n_cols: int):
+    pair_keys = [keys for keys in pair_keys if len(keys)]
+    if not pair_keys:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pair_keys = np.unique(np.concatenate(pair_keys))
+    return pair_keys // n_cols, pair_keys % n_cols
+
+
+def _score_pairs(a, b, rows: np.ndarray, cols: np.ndarray, tile_size: int = 1024):
+    """
+    Cosine score of each (rows[k], cols[k]) pair. Pairs are scored in chunks whose gathered
+    rows hold about as many values as one tile_size x tile_size block, so peak memory matches the tiled path.
+    """
+    # Values per gathered row: the embedding dimension, or the mean stored values per sparse row
+    width = max(1, a.nnz // max(1, a.shape[0])) if sparse.issparse(a) else a.shape[1]
+    chunk_size = max(1, tile_size * tile_size // width)
+    scores = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), chunk_size):
+        end = start + chunk_size
+        if sparse.issparse(a):
+            scores[start:end] = np.asarray(a[rows[start:end]].multiply(b[cols[start:end]]).sum(axis=1)).ravel()
+        else:
+            scores[start:end] = np.einsum("ij,ij->i", a[rows[start:end]], b[cols[start:end]])
+    return scores
+
+
+class RandomProjectionLSH:
+    """
+    Random-hyperplane LSH for cosine similarity. Each of n_tables hashes a vector to
+    the sign pattern of n_bits random projections; rows sharing a bucket in any table
+    become candidate pairs. More tables raise recall, more bits shrink the buckets
+    (faster, lower recall).
+    """
+
+    def __init__(self, dim: int, n_tables: int = 32, n_bits: int = 12, seed: int = 0):
+        if n_bits > 62:
+            raise ValueError("n_bits must be at most 62")
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, dim, n_bits)).astype(np.float32)
+        self.weights = (1 << np.arange(n_bits, dtype=np.int64))
+
+    def hash(self, x: np.ndarray) -> np.ndarray:
+        """Return an (n_tables, len(x)) array of bucket codes"""
+        bits = np.einsum("nd,tdk->tnk", x, self.planes) > 0
+        return bits.astype(np.int64) @ self.weights
+
+    def candidate_pairs(self, a: np.ndarray, b: np.ndarray):
+        codes_a = self.hash(a)
+        codes_b = self.hash(b)
+        pair_keys = [_join_pair_keys(table_a, table_b) for table_a, table_b in zip(codes_a, codes_b)]
+        return _unique_pairs(pair_keys, len(b))
+
+
+def ann_similar_pairs(a: np.ndarray, b: np.ndarray, threshold: float, n_tables: int = 32,
+                      n_bits: int = 12, seed: int = 0, tile_size: int = 1024):
+    """Approximate blockwise_similar_pairs: only LSH candidate pairs are scored"""
+    if len(a) == 0 or len(b) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    index = RandomProjectionLSH(a.shape[1], n_tables, n_bits, seed)
+    rows, cols = index.candidate_pairs(a, b)
+    scores = _score_pairs(a, b, rows, cols, tile_size)
+    keep = scores > threshold
+    print(f"ANN scored {len(rows)} candidate pairs out of {len(a) * len(b)} "
+          f"({len(rows) / (len(a) * len(b)):.2%})")
+    return rows[keep], cols[keep], scores[keep]
+
+
+def ann_recall(a: np.ndarray, b: np.ndarray, threshold: float, sample_size: int = 200,
+               n_tables: int = 32, n_bits: int = 12, seed: int = 0, tile_size: int = 1024) -> float:
+    """Recall of the ANN path against the exact path on a random sample of rows of a"""
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(a), size=min(sample_size, len(a)), replace=False)
+    exact = blockwise_similar_pairs(a[sample], b, threshold, tile_size)
+    if len(exact[0]) == 0:
+        return 1.0
+    approx = ann_similar_pairs(a[sample], b, threshold, n_tables, n_bits, seed, tile_size)
+    exact_pairs = set(zip(exact[0].tolist(), exact[1].tolist()))
+    found = exact_pairs & set(zip(approx[0].tolist(), approx[1].tolist()))
+    return len(found) / len(exact_pairs)
+
+
+_COMPANY_SUFFIXES = r"\b(inc|llc|ltd|limited|gmbh|corp|corporation|co|ag|sa|plc|foundation)\b"
+
+
+def normalize_company(companies: pd.Series) -> pd.Series:
+    """Blocking key for company names: lowercase alphanumerics without legal suffixes"""
+    return (companies.fillna("").astype(str).str.lower()
+            .str.replace(r"[^a-z0-9 ]", " ", regex=True)
+            .str.replace(_COMPANY_SUFFIXES, " ", regex=True)
+            .str.replace(r"\s+", "", regex=True))
+
+
+_NO_DAY = np.iinfo(np.int64).min + 1
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    dates = pd.to_datetime(dates, errors="coerce")
+    days = dates.values.astype("datetime64[D]").astype(np.int64)
+    return np.where(dates.isna().values, _NO_DAY, days)
+
+
+def blocked_candidate_pairs(companies_a: pd.Series, companies_b: pd.Series, dates_a: pd.Series = None,
+                            dates_b: pd.Series = None, date_window_days: int = None):
+    """
+    Candidate pairs that share a normalized company, or (when date_window_days is set) were
+    posted within date_window_days of each other. Rows with an empty company fall back to
+    being paired with every row of the other side.
+    """
+    keys_a = normalize_company(companies_a)
+    keys_b = normalize_company(companies_b)
+    n_a, n_b = len(keys_a), len(keys_b)
+
+    # Company block: factorize both sides together so equal keys get equal codes
+    codes, _ = pd.factorize(pd.concat([keys_a, keys_b], ignore_index=True))
+    codes_a, codes_b = codes[:n_a], codes[n_a:]
+    empty_a, empty_b = (keys_a == "").values, (keys_b == "").values
+    pair_keys = [_join_pair_keys(np.where(empty_a, -1, codes_a), np.where(empty_b, -2, codes_b))]
+
+    # Date-window block
+    if date_window_days is not None and dates_a is not None and dates_b is not None:
+        days_a = _day_numbers(dates_a)
+        days_b = _day_numbers(dates_b)
+        for shift in range(-date_window_days, date_window_days + 1):
+            # Missing dates get sentinel codes that never match
+            pair_keys.append(_join_pair_keys(np.where(days_a == _NO_DAY, _NO_DAY - 1, days_a + shift), days_b))
+
+    # Fallback cross-block pass for rows without a company
+    rows = np.flatnonzero(empty_a)
+    pair_keys.append((rows[:, None] * n_b + np.arange(n_b)[None, :]).ravel())
+    cols = np.flatnonzero(empty_b)
+    pair_keys.append((np.arange(n_a)[:, None] * n_b + cols[None, :]).ravel())
+
+    return _unique_pairs(pair_keys, n_b)
+
+
+def blocked_similar_pairs(a, b, candidate_rows: np.ndarray, candidate_cols: np.ndarray, threshold: float,
+                          tile_size: int = 1024):
+    """Score only the candidate pairs (dense or sparse normalized vectors) and keep those above threshold"""
+    scores = _score_pairs(a, b, candidate_rows, candidate_cols, tile_size)
+    keep = scores > threshold
+    return candidate_rows[keep], candidate_cols[keep], scores[keep]
+
+
+class UnionFind:
+    """Disjoint-set forest over row indices 0..n-1, with path halving and union by size"""
+
+    def __init__(self, n: int):
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> None:
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x == root_y:
+            return
+        if self.size[root_x] < self.size[root_y]:
+            root_x, root_y = root_y, root_x
+        self.parent[root_y] = root_x
+        self.size[root_x] += self.size[root_y]
+
+    def labels(self) -> np.ndarray:
+        """Cluster label (root index) of every element"""
+        return np.array([self.find(x) for x in range(len(self.parent))])
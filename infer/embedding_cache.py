@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by a hash of (model, text).
+    Vectors are stored as float32 rows in a memory-mapped file, with a JSON index
+    mapping each key to its row and last-used time. Least recently used rows are
+    evicted when the store grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, model: str, max_bytes: int = 512 * 1024 * 1024):
+        self.model = model
+        self.max_bytes = max_bytes
+        self.cache_dir = os.path.join(cache_dir, model.replace("/", "_").replace(":", "_"))
+        self.data_path = os.path.join(self.cache_dir, "embeddings.f32")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+
+        self.dim = None
+        self.entries = {}
+        if os.path.exists(self.index_path) and os.path.exists(self.data_path):
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+                self.dim = index["dim"]
+                self.entries = index["entries"]
+            except (ValueError, KeyError) as e:
+                print(f"Embedding cache index unreadable ({e}), starting empty")
+                self.dim = None
+                self.entries = {}
+        self._vectors = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _load_vectors(self):
+        if self._vectors is None and self.entries:
+            self._vectors = np.memmap(self.data_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+        return self._vectors
+
+    def get_many(self, texts: list) -> dict:
+        """Return {text: vector} for every text found in the cache"""
+        found = {}
+        vectors = self._load_vectors()
+        now = int(time.time())
+        for text in texts:
+            entry = self.entries.get(self.key(text))
+            if entry is None or vectors is None or entry[0] >= len(vectors):
+                self.misses += 1
+                continue
+            entry[1] = now
+            found[text] = np.array(vectors[entry[0]])
+            self.hits += 1
+        return found
+
+    def put_many(self, texts: list, vectors) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            print(f"Embedding dimension changed ({self.dim} -> {vectors.shape[1]}), resetting cache")
+            self.entries = {}
+        if not self.entries:
+            self.dim = vectors.shape[1]
+            os.makedirs(self.cache_dir, exist_ok=True)
+            open(self.data_path, "wb").close()
+
+        # Release the current mapping before appending to the file
+        self._vectors = None
+        first_row = os.path.getsize(self.data_path) // (4 * self.dim)
+        with open(self.data_path, "ab") as f:
+            f.write(vectors.tobytes())
+        now = int(time.time())
+        for i, text in enumerate(texts):
+            self.entries[self.key(text)] = [first_row + i, now]
+
+    def save(self) -> None:
+        """Evict least recently used rows beyond max_bytes, then write the index"""
+        if not self.entries:
+            return
+        row_bytes = 4 * self.dim
+        max_rows = max(1, self.max_bytes // row_bytes)
+        total_rows = os.path.getsize(self.data_path) // row_bytes
+
+        # Compact when rows need evicting or stale rows take up space in the file
+        if len(self.entries) > max_rows or total_rows > len(self.entries):
+            keep = sorted(self.entries.items(), key=lambda kv: kv[1][1], reverse=True)[:max_rows]
+            vectors = self._load_vectors()
+            keep.sort(key=lambda kv: kv[1][0])
+            compacted = np.asarray(vectors[[entry[0] for _, entry in keep]], dtype=np.float32)
+            self._vectors = None
+            tmp_path = self.data_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compacted.tobytes())
+            os.replace(tmp_path, self.data_path)
+            evicted = len(self.entries) - len(keep)
+            self.entries = {k: [row, entry[1]] for row, (k, entry) in enumerate(keep)}
+            if evicted:
+                print(f"Embedding cache evicted {evicted} entries")
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model, "dim": self.dim, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path)
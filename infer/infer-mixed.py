@@ -3,11 +3,28 @@ from supabase import create_client, Client
 from openai import OpenAI
 from dotenv import load_dotenv
 import os
-from sklearn.metrics.pairwise import cosine_similarity
+import sys
 import numpy as np
 import ast
 import re
 import time
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+# Helpers shared with the scrape scripts live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache import EmbeddingCache
+from classification_cache import ClassificationCache
+from llm_executor import RateLimiter, run_concurrently
+from cascade import CascadeTier, run_cascade
+from location_gazetteer import Gazetteer, canonicalize_location
+from json_records import json_safe_records
+from bulk_writer import BulkWriter
+from job_function_model import (clean_titles, job_function_list, get_labelled_jobs, load_job_function_model,
+                                predict_job_functions)
+from dedup import (normalize_embeddings, blockwise_similar_pairs, ann_similar_pairs, ann_recall, UnionFind,
+                   local_vectors, sparse_similar_pairs, blocked_candidate_pairs, blocked_similar_pairs)
+from scipy import sparse
 
 
 # Load environment variables
@@ -19,35 +36,161 @@ supabaseKey = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(supabaseUrl, supabaseKey)
 aiClient= OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
+# Concurrent, adaptive, resumable upserts for the enriched jobs
+UPLOAD_MAX_WORKERS = 4
+UPLOAD_BATCH_SIZE = 500
+bulk_writer = BulkWriter(supabaseUrl, supabaseKey, max_workers=UPLOAD_MAX_WORKERS, batch_size=UPLOAD_BATCH_SIZE)
+
 
 job_sources = ["web3career", "cryptojobscom"]  
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Per-request limits for batched embedding calls (the API accepts up to 2048 inputs)
+EMBEDDING_BATCH_MAX_ITEMS = 512
+EMBEDDING_BATCH_MAX_TOKENS = 100000
+
+# Persistent embedding cache so repeat job strings skip the API
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, EMBEDDING_CACHE_MAX_BYTES)
+
+SIMILARITY_THRESHOLD = 0.85
+# Threshold for the offline char n-gram TF-IDF backend (title + company only)
+LOCAL_SIMILARITY_THRESHOLD = 0.9
+# Rows per side of each similarity block; peak memory is tile_size^2 float32s
+SIMILARITY_TILE_SIZE = 1024
+
+# Approximate (LSH) similarity search: more tables raise recall, more bits make it faster.
+# 32 x 12 keeps recall >= 95% for pairs right at SIMILARITY_THRESHOLD
+ANN_TABLES = 32
+ANN_BITS = 12
+ANN_RECALL_SAMPLE = 200
+
+JOB_FUNCTION_MODEL = "ft:gpt-3.5-turbo-0125:personal::BDiM7gWS"
+
+# Local TF-IDF + linear model (trained offline with job_function_model.py); titles it is less sure of go to the LLM
+job_function_model = load_job_function_model()
+
+# Job function cascade: keywords -> cache -> local model -> fine-tuned model.
+# A tier's label is kept only at or above its confidence threshold; the rest moves on to the next tier.
+KEYWORD_MIN_CONFIDENCE = 0.9
+KEYWORD_AMBIGUOUS_CONFIDENCE = 0.5
+LOCAL_MODEL_MIN_CONFIDENCE = 0.8
+# Rough cost of one fine-tuned model call (~30 input + 10 output tokens)
+LLM_COST_PER_TITLE_USD = 0.00015
+
+# Persistent title -> job function cache; bump the version to invalidate answers from the same model
+CLASSIFICATION_CACHE_PATH = os.getenv("CLASSIFICATION_CACHE_PATH", ".cache/job_functions.sqlite")
+CLASSIFICATION_CACHE_VERSION = 2
+classification_cache = ClassificationCache(CLASSIFICATION_CACHE_PATH, JOB_FUNCTION_MODEL, CLASSIFICATION_CACHE_VERSION)
+
+# Offline country lookup and persistent location -> country cache fed by past LLM answers
+LOCATION_MODEL = "gpt-4o-mini"
+LOCATION_CACHE_PATH = os.getenv("LOCATION_CACHE_PATH", ".cache/locations.sqlite")
+LOCATION_CACHE_VERSION = 1
+gazetteer = Gazetteer()
+location_cache = ClassificationCache(LOCATION_CACHE_PATH, LOCATION_MODEL, LOCATION_CACHE_VERSION,
+                                     table="locations", key_column="location", value_column="country")
+# Locations per request, and how many times to re-ask for locations missing from a response
+LOCATION_CHUNK_SIZE = 50
+LOCATION_REASK_ROUNDS = 2
+
+# Concurrency and rate limits for chat completion calls
+LLM_MAX_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 200000
+llm_rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+# Columns the pipeline reads from the cleaned source tables, and rows per range request
+SOURCE_COLUMNS = ['title', 'company', 'location', 'salary_amount', 'skills', 'source', 'job_url',
+                  'job_id', 'posted_datetime', 'is_remote', 'ingestion_date']
+LATEST_DATA_PAGE_SIZE = 1000
+
+# Keys per jobs_clean lookup request in incremental mode (keeps the filter URL short)
+EXISTING_LOOKUP_CHUNK_SIZE = 100
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Deduplicate and enrich the latest scraped jobs')
+    parser.add_argument('--similarity_method', choices=['exact', 'ann'], default='exact',
+                        help='Exact tiled search or approximate LSH search for duplicate jobs')
+    parser.add_argument('--ann_tables', type=int, default=ANN_TABLES,
+                        help='With --similarity_method ann, LSH hash tables (more raise recall)')
+    parser.add_argument('--ann_bits', type=int, default=ANN_BITS,
+                        help='With --similarity_method ann, bits per LSH hash (more make it faster, lower recall)')
+    parser.add_argument('--dedup_backend', choices=['embedding', 'local'], default='embedding',
+                        help='OpenAI embeddings or offline char n-gram TF-IDF vectors for duplicate jobs')
+    parser.add_argument('--compare_backends', action='store_true',
+                        help='Report how many duplicates each dedup backend finds before deduplicating')
+    parser.add_argument('--blocking', action='store_true',
+                        help='Only score job pairs sharing a normalized company (or a posted-date window)')
+    parser.add_argument('--block_date_window', type=int, default=None,
+                        help='With --blocking, also pair jobs posted within this many days of each other')
+    parser.add_argument('--warm_cache', action='store_true',
+                        help='Seed the job function cache from jobs_clean (done automatically when it is empty)')
+    parser.add_argument('--inference_mode', choices=['concurrent', 'sequential'], default='concurrent',
+                        help='Run job function and location inference in parallel or one after the other')
+    parser.add_argument('--page_size', type=int, default=LATEST_DATA_PAGE_SIZE,
+                        help='Rows per range request when reading the latest scrape batch')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse job functions and locations of jobs already in jobs_clean; only enrich new jobs')
+    return parser
+
+
 def main():
 
+    args = build_arg_parser().parse_args()
+
     # Get job data from supabase
-    df1 = get_job_latest_data(job_sources[0])
-    df2 = get_job_latest_data(job_sources[1])
+    dfs = [get_job_latest_data(source, args.page_size) for source in job_sources]
 
-    # df1.to_csv('df1.csv', index=False)
-    # df2.to_csv('df2.csv', index=False)
-    print("\nDataset 1 size:", len(df1))
-    print("Dataset 2 size:", len(df2))
+    return process_jobs(dfs, args)
 
-    if df1.empty and df2.empty:
-        print("Both datasets empty — nothing to process")
+
+def process_jobs(dfs: list, args: argparse.Namespace) -> pd.DataFrame:
+    """Deduplicate, enrich and upload one frame per entry in job_sources"""
+    for source, df in zip(job_sources, dfs):
+        print(f"\n{source} dataset size:", len(df))
+
+    if all(df.empty for df in dfs):
+        print("All datasets empty — nothing to process")
         return pd.DataFrame()
 
-    # Calculate job similarity
-    combined_df = calculate_job_similarity(df1, df2)
+    if args.compare_backends:
+        compare_dedup_backends(dfs, job_sources, method=args.similarity_method,
+                               ann_tables=args.ann_tables, ann_bits=args.ann_bits)
+
+    # Deduplicate jobs across all sources
+    combined_df = deduplicate_jobs(dfs, job_sources, method=args.similarity_method, backend=args.dedup_backend,
+                                   blocking=args.blocking, date_window_days=args.block_date_window,
+                                   ann_tables=args.ann_tables, ann_bits=args.ann_bits)
     print("\nFinal combined dataset size:", len(combined_df))
 
-    # Infer job function
-    combined_df = infer_job_function(combined_df)
-    print("Job functions inferred")
+    carried_df = pd.DataFrame()
+    if args.incremental:
+        # Jobs enriched in an earlier run keep their stored job function and location
+        combined_df, carried_df = split_new_jobs(combined_df)
 
-    # Infer location
-    combined_df = infer_location(combined_df)
-    print("Locations inferred")
+    if args.warm_cache or len(classification_cache) == 0:
+        warm_classification_cache(classification_cache)
+
+    if not combined_df.empty:
+        if args.inference_mode == 'concurrent':
+            # Infer job function and location at the same time
+            combined_df = infer_job_function_and_location(combined_df)
+        else:
+            # Infer job function
+            combined_df = infer_job_function(combined_df)
+            print("Job functions inferred")
+
+            # Infer location
+            combined_df = infer_location(combined_df)
+            print("Locations inferred")
+
+    if not carried_df.empty:
+        # Carried-over jobs whose stored job function or location was Unknown are enriched again
+        carried_df = infer_unknown_fields(carried_df)
+
+    combined_df = pd.concat([combined_df, carried_df], ignore_index=True)
 
     # Clean data
     combined_df = clean_data(combined_df)
@@ -65,115 +208,304 @@ def main():
     return combined_df
 
 
-def calculate_job_similarity(df1: pd.DataFrame, df2: pd.DataFrame):
-
-    # Reset index
-    df1 = df1.reset_index(drop=True)
-    df2 = df2.reset_index(drop=True)
-
-    if df1.empty or df2.empty:
-        if df1.empty and df2.empty:
-            print("\nBoth datasets empty; skipping similarity")
-        elif df1.empty:
-            print("\nFirst dataset empty; skipping similarity")
-        else:
-            print("\nSecond dataset empty; skipping similarity")
-        return pd.concat([df1, df2]).reset_index(drop=True)
-
-    # Ensure all columns are strings
-    df1["title"] = df1["title"].fillna("").astype(str)
-    df1["company"] = df1["company"].fillna("").astype(str)
-    df1["posted_datetime"] = df1["posted_datetime"].fillna("").astype(str)
-    df2["title"] = df2["title"].fillna("").astype(str)
-    df2["company"] = df2["company"].fillna("").astype(str)
-    df2["posted_datetime"] = df2["posted_datetime"].fillna("").astype(str)
-
-    # Combine title, company, and posted date into a single column for identification
-    df1["combined"] = df1["title"] + " " + df1["company"] + " " + df1["posted_datetime"]
-    df2["combined"] = df2["title"] + " " + df2["company"] + " " + df2["posted_datetime"]
-
-    # Get embeddings for the combined columns   
-    df1['embedding'] = df1['combined'].apply(get_embedding)
-    df2['embedding'] = df2['combined'].apply(get_embedding)
-
-    # Convert embeddings to numpy arrays
-    df1_embeddings = np.array(df1["embedding"].tolist())
-    df2_embeddings = np.array(df2["embedding"].tolist())
-
-    # Calculate cosine similarity between embeddings
-    similarity_matrix = cosine_similarity(df1_embeddings, df2_embeddings)
-
-    threshold = 0.85
-    
-    # Find similar pairs above threshold
-    similar_indices = np.where(similarity_matrix > threshold)
-    similar_pairs = pd.DataFrame({
-        'job1_index': similar_indices[0],
-        'job2_index': similar_indices[1],
-        'similarity': similarity_matrix[similar_indices],
-        'job1_title': df1.iloc[similar_indices[0]]['title'].values,
-        'job2_title': df2.iloc[similar_indices[1]]['title'].values,
-        'job1_company': df1.iloc[similar_indices[0]]['company'].values,
-        'job2_company': df2.iloc[similar_indices[1]]['company'].values,
-        'job1_location': df1.iloc[similar_indices[0]]['location'].values,
-        'job2_location': df2.iloc[similar_indices[1]]['location'].values
-    })
-    
-    if not similar_pairs.empty:
-        # Sort by similarity
-        similar_pairs = similar_pairs.sort_values('similarity', ascending=False)
-        
-        # Create masks for location presence
-        job1_has_location = similar_pairs['job1_location'].notna()
-        job2_has_location = similar_pairs['job2_location'].notna()
-        
-        # Create masks for different conditions
-        # Keep job2 if it has location and job1 does not
-        keep_job2 = (job1_has_location == False) & (job2_has_location == True)
-        # Keep job1 if it does not have location or job2 does not have location
-        keep_job1 = ~keep_job2 
-        
-        # Get unique indices to drop from both dataframes
-        indices_to_drop_df1 = set(similar_pairs[keep_job2]['job1_index'])
-        indices_to_drop_df2 = set(similar_pairs[keep_job1]['job2_index'])
-        
-        # Remove duplicates from both dataframes
-        df1_unique = df1.drop(indices_to_drop_df1)
-        df2_unique = df2.drop(indices_to_drop_df2)
-        
-        print(f"\nFound {len(similar_pairs)} pairs of similar jobs above threshold {threshold}")
-        print(f"Removed {len(indices_to_drop_df1)} jobs from first dataset")
-        print(f"Removed {len(indices_to_drop_df2)} jobs from second dataset")
-        print("\nSimilar job pairs:")
-        
-        # Combine unique jobs from both sources
-        combined_df = pd.concat([df1_unique, df2_unique]).reset_index(drop=True)
-    
+def calculate_job_similarity(df1: pd.DataFrame, df2: pd.DataFrame, threshold=None,
+                             tile_size=SIMILARITY_TILE_SIZE, method="exact", backend="embedding"):
+    return deduplicate_jobs([df1, df2], threshold=threshold, tile_size=tile_size, method=method, backend=backend)
+
+
+def find_similar_pairs(embeddings1: np.ndarray, embeddings2: np.ndarray, threshold=SIMILARITY_THRESHOLD,
+                       tile_size=SIMILARITY_TILE_SIZE, method="exact", ann_tables=ANN_TABLES, ann_bits=ANN_BITS):
+    if sparse.issparse(embeddings1):
+        # Local TF-IDF vectors are sparse; the LSH index only handles dense embeddings
+        return sparse_similar_pairs(embeddings1, embeddings2, threshold, tile_size)
+
+    if method == "ann":
+        # Only score LSH candidate neighbours, and check recall against the exact path on a sample
+        similar_indices = ann_similar_pairs(embeddings1, embeddings2, threshold, ann_tables, ann_bits,
+                                            tile_size=tile_size)
+        recall = ann_recall(embeddings1, embeddings2, threshold, ANN_RECALL_SAMPLE, ann_tables, ann_bits,
+                            tile_size=tile_size)
+        print(f"ANN recall on a sample of {min(ANN_RECALL_SAMPLE, len(embeddings1))} jobs: {recall:.2%}")
+        return similar_indices
+
+    # Exact search, one block of the similarity matrix at a time
+    return blockwise_similar_pairs(embeddings1, embeddings2, threshold, tile_size)
+
+
+def deduplicate_jobs(dfs: list, source_names: list = None, threshold=None,
+                     tile_size=SIMILARITY_TILE_SIZE, method="exact", backend="embedding",
+                     blocking=False, date_window_days=None, ann_tables=ANN_TABLES, ann_bits=ANN_BITS):
+    source_names = source_names or [f"dataset {i + 1}" for i in range(len(dfs))]
+    if threshold is None:
+        threshold = LOCAL_SIMILARITY_THRESHOLD if backend == "local" else SIMILARITY_THRESHOLD
+
+    # Reset index and skip empty sources
+    sources = []
+    for name, df in zip(source_names, dfs):
+        if df.empty:
+            print(f"\n{name} empty; skipping similarity")
+            continue
+        sources.append((name, df.reset_index(drop=True)))
+
+    if len(sources) < 2:
+        return pd.concat([df for _, df in sources] or [pd.DataFrame()]).reset_index(drop=True)
+
+    for _, df in sources:
+        # Ensure all columns are strings
+        df["title"] = df["title"].fillna("").astype(str)
+        df["company"] = df["company"].fillna("").astype(str)
+        df["posted_datetime"] = df["posted_datetime"].fillna("").astype(str)
+
+        # Combine title, company, and posted date into a single column for identification
+        df["combined"] = df["title"] + " " + df["company"] + " " + df["posted_datetime"]
+
+    if backend == "local":
+        # Offline vectors over title + company; no network calls
+        embeddings = local_vectors([(df["title"] + " " + df["company"]).tolist() for _, df in sources])
     else:
+        # Get embeddings for the combined columns, from the cache or in batched requests
+        embeddings = [normalize_embeddings(get_cached_embeddings(df['combined'].tolist())) for _, df in sources]
+        embedding_cache.save()
+        print(f"\nEmbedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses")
+
+    # Stack all sources; each row gets a global index, offset by the sizes of earlier sources
+    combined_df = pd.concat([df for _, df in sources]).reset_index(drop=True)
+    offsets = np.cumsum([0] + [len(df) for _, df in sources])
+
+    # Find similar pairs above threshold between every pair of sources
+    pair_frames = []
+    candidate_count = 0
+    for a in range(len(sources)):
+        for b in range(a + 1, len(sources)):
+            if blocking:
+                # Only score pairs sharing a blocking key, plus rows with no company against everything
+                df_a, df_b = sources[a][1], sources[b][1]
+                candidates = blocked_candidate_pairs(df_a['company'], df_b['company'], df_a['posted_datetime'],
+                                                     df_b['posted_datetime'], date_window_days)
+                candidate_count += len(candidates[0])
+                similar_indices = blocked_similar_pairs(embeddings[a], embeddings[b], *candidates, threshold,
+                                                        tile_size)
+            else:
+                similar_indices = find_similar_pairs(embeddings[a], embeddings[b], threshold, tile_size, method,
+                                                     ann_tables, ann_bits)
+            print(f"{sources[a][0]} vs {sources[b][0]}: {len(similar_indices[0])} similar pairs")
+            pair_frames.append(pd.DataFrame({
+                'job1_index': similar_indices[0] + offsets[a],
+                'job2_index': similar_indices[1] + offsets[b],
+                'similarity': similar_indices[2],
+            }))
+    similar_pairs = pd.concat(pair_frames, ignore_index=True)
+
+    if blocking:
+        all_pairs = sum(len(sources[a][1]) * len(sources[b][1])
+                        for a in range(len(sources)) for b in range(a + 1, len(sources)))
+        print(f"Blocking scored {candidate_count} of {all_pairs} candidate pairs "
+              f"(reduction ratio {1 - candidate_count / all_pairs:.2%})")
+
+    if similar_pairs.empty:
         print("\nNo similar jobs found above threshold")
-        # Combine all jobs from both sources
-        combined_df = pd.concat([df1, df2]).reset_index(drop=True)
-    
-    return combined_df
+        return combined_df
+
+    similar_pairs['job1_title'] = combined_df['title'].values[similar_pairs['job1_index']]
+    similar_pairs['job2_title'] = combined_df['title'].values[similar_pairs['job2_index']]
+    similar_pairs['job1_company'] = combined_df['company'].values[similar_pairs['job1_index']]
+    similar_pairs['job2_company'] = combined_df['company'].values[similar_pairs['job2_index']]
+    similar_pairs = similar_pairs.sort_values('similarity', ascending=False)
+
+    # Cluster duplicates across all sources: jobs linked by any chain of similar pairs belong together
+    clusters = UnionFind(len(combined_df))
+    for job1_index, job2_index in zip(similar_pairs['job1_index'], similar_pairs['job2_index']):
+        clusters.union(job1_index, job2_index)
+
+    # Keep one job per cluster: the first one (in source order) that has a location, else the first one
+    candidates = pd.DataFrame({
+        'cluster': clusters.labels(),
+        'missing_location': combined_df['location'].isna().values,
+        'row': np.arange(len(combined_df)),
+    })
+    survivors = (candidates.sort_values(['cluster', 'missing_location', 'row'])
+                 .drop_duplicates(subset=['cluster'])['row'].sort_values().values)
+
+    print(f"\nFound {len(similar_pairs)} pairs of similar jobs above threshold {threshold}")
+    print(f"Grouped into {(np.bincount(candidates['cluster']) > 1).sum()} duplicate clusters")
+    kept = np.zeros(len(combined_df), dtype=bool)
+    kept[survivors] = True
+    for i, (name, _) in enumerate(sources):
+        print(f"Removed {(~kept[offsets[i]:offsets[i + 1]]).sum()} jobs from {name}")
+
+    return combined_df.iloc[survivors].reset_index(drop=True)
+
+
+def compare_dedup_backends(dfs: list, source_names: list = None, method="exact", ann_tables=ANN_TABLES,
+                           ann_bits=ANN_BITS):
+    input_size = sum(len(df) for df in dfs)
+    removed = {}
+    for backend in ["embedding", "local"]:
+        print(f"\n--- Dedup backend: {backend} ---")
+        deduped = deduplicate_jobs(dfs, source_names, method=method, backend=backend, ann_tables=ann_tables,
+                                   ann_bits=ann_bits)
+        removed[backend] = input_size - len(deduped)
+
+    print("\n=== Dedup Backend Comparison ===")
+    print(f"Input jobs: {input_size}")
+    for backend, count in removed.items():
+        print(f"{backend}: {count} duplicates removed")
+    return removed
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough estimate (~4 characters per token) to keep batches under the token limit
+    return max(1, len(text) // 4)
+
+
+def _embedding_batches(texts: list, max_items: int, max_tokens: int):
+    batch_start = 0
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = _estimate_tokens(text)
+        if i > batch_start and (i - batch_start >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch_start, i
+            batch_start = i
+            batch_tokens = 0
+        batch_tokens += tokens
+    if batch_start < len(texts):
+        yield batch_start, len(texts)
+
+
+def get_embeddings(texts: list, retries=3, max_items=EMBEDDING_BATCH_MAX_ITEMS,
+                   max_tokens=EMBEDDING_BATCH_MAX_TOKENS) -> list:
+    # The API rejects empty strings, so send a single space in their place
+    texts = [text if text else " " for text in texts]
+    embeddings = []
+    for start, end in _embedding_batches(texts, max_items, max_tokens):
+        batch = texts[start:end]
+        for attempt in range(retries):
+            try:
+                response = aiClient.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=batch,
+                    encoding_format="float"
+                )
+                # Results are not guaranteed to come back in input order
+                embeddings.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+                break
+            except Exception as e:
+                if attempt < retries - 1:
+                    wait = 2 ** attempt
+                    print(f"Embedding API error on batch {start}-{end} (attempt {attempt + 1}/{retries}): {e}, retrying in {wait}s...")
+                    time.sleep(wait)
+                else:
+                    print(f"Embedding API failed on batch {start}-{end} after {retries} attempts: {e}")
+                    raise
+        print(f"  Embedded batch {start}-{end} ({len(batch)} texts)")
+    return embeddings
+
+
+def get_cached_embeddings(texts: list, cache: EmbeddingCache = None) -> list:
+    cache = cache or embedding_cache
+    unique_texts = list(dict.fromkeys(texts))
+    vectors = cache.get_many(unique_texts)
+
+    # Only embed texts the cache has not seen before
+    missing = [text for text in unique_texts if text not in vectors]
+    if missing:
+        new_vectors = get_embeddings(missing)
+        cache.put_many(missing, new_vectors)
+        vectors.update(zip(missing, np.asarray(new_vectors, dtype=np.float32)))
+
+    return [vectors[text] for text in texts]
+
+
+def make_my_id(df: pd.DataFrame) -> pd.Series:
+    # Same key jobs_clean is upserted on: posted date plus the source job id
+    job_id = pd.to_numeric(df['job_id'], errors='coerce').astype("Int64")
+    posted_date = pd.to_datetime(df['posted_datetime'], errors='coerce').dt.strftime('%Y-%m-%d')
+    return posted_date.astype(str) + "-" + job_id.astype(str)
+
+
+def get_existing_jobs(column: str, values: list, chunk_size=EXISTING_LOOKUP_CHUNK_SIZE) -> pd.DataFrame:
+    # Fetch the enriched fields of jobs_clean rows whose column matches one of the values
+    rows = []
+    for i in range(0, len(values), chunk_size):
+        response = (
+            supabase.table("jobs_clean")
+            .select("my_id, job_url, job_function, location")
+            .in_(column, values[i:i + chunk_size])
+            .execute()
+        )
+        rows.extend(response.data)
+    return pd.DataFrame(rows, columns=["my_id", "job_url", "job_function", "location"])
 
 
-def get_embedding(text, retries=3):
-    for attempt in range(retries):
-        try:
-            response = aiClient.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                encoding_format="float"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            if attempt < retries - 1:
-                wait = 2 ** attempt
-                print(f"Embedding API error (attempt {attempt + 1}/{retries}): {e}, retrying in {wait}s...")
-                time.sleep(wait)
-            else:
-                print(f"Embedding API failed after {retries} attempts: {e}")
-                raise
+def split_new_jobs(df: pd.DataFrame):
+    """
+    Split jobs into those not yet in jobs_clean and those already enriched there, matched on
+    my_id and then on job_url. Returns (new_df, carried_df); carried rows get their stored
+    job_function and location_country so they can skip inference, with NaN where the
+    stored value was Unknown.
+    """
+    if df.empty:
+        return df, pd.DataFrame()
+    df = df.reset_index(drop=True)
+    my_ids = make_my_id(df)
+
+    existing = get_existing_jobs("my_id", my_ids.unique().tolist())
+    by_id = existing.drop_duplicates(subset=["my_id"]).set_index("my_id")
+    job_function = my_ids.map(by_id["job_function"]).astype(object)
+    location = my_ids.map(by_id["location"]).astype(object)
+
+    # Fall back to the job URL for jobs whose id or posted date changed since they were stored
+    unmatched = job_function.isna() & df["job_url"].notna()
+    if unmatched.any():
+        existing = get_existing_jobs("job_url", df.loc[unmatched, "job_url"].unique().tolist())
+        by_url = existing.drop_duplicates(subset=["job_url"]).set_index("job_url")
+        job_function[unmatched] = df.loc[unmatched, "job_url"].map(by_url["job_function"])
+        location[unmatched] = df.loc[unmatched, "job_url"].map(by_url["location"])
+
+    # A stored Unknown is what a failed model call leaves behind, so it does not count as enriched
+    job_function = job_function.where(job_function.isin(job_function_list))
+    location = location.where(location.notna() & (location != "Unknown"))
+
+    carried = job_function.notna() | location.notna()
+    carried_df = df[carried].copy()
+    carried_df["job_function"] = job_function[carried]
+    carried_df["location_country"] = location[carried]
+
+    print("\n=== Incremental Run ===")
+    print(f"New jobs: {(~carried).sum()}, carried over from jobs_clean: {carried.sum()} "
+          f"({carried.mean():.1%} of {len(df)}), of which {carried_df['job_function'].isna().sum()} need a job function "
+          f"and {carried_df['location_country'].isna().sum()} a location again")
+    return df[~carried].reset_index(drop=True), carried_df.reset_index(drop=True)
+
+
+def infer_unknown_fields(df: pd.DataFrame) -> pd.DataFrame:
+    # Send carried-over jobs with a missing job function or location back through that stage only
+    needs_function = df['job_function'].isna()
+    if needs_function.any():
+        inferred = infer_job_function(df.loc[needs_function, ['title']].copy())
+        df.loc[needs_function, 'job_function'] = inferred['job_function'].values
+    needs_location = df['location_country'].isna()
+    if needs_location.any():
+        inferred = infer_location(df.loc[needs_location, ['location', 'is_remote']].copy())
+        df.loc[needs_location, 'location_country'] = inferred['location_country'].values
+    return df
+
+
+def infer_job_function_and_location(df):
+    # Both stages are network-bound and read disjoint columns, so run them on their own copies in parallel
+    df = df.reset_index(drop=True)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        job_function_future = executor.submit(infer_job_function, df[['title']].copy())
+        location_future = executor.submit(infer_location, df[['location', 'is_remote']].copy())
+        job_function_df = job_function_future.result()
+        location_df = location_future.result()
+    print("Job functions and locations inferred")
+
+    # Both stages keep the row order, so merge the new columns back positionally
+    df['title'] = job_function_df['title'].values
+    df['job_function'] = job_function_df['job_function'].values
+    df['location_country'] = location_df['location_country'].values
+    return df
 
 
 def infer_location(df):
@@ -186,13 +518,44 @@ def infer_location(df):
     # Override to Remote when is_remote flag is set, but keep existing values otherwise
     df.loc[df['is_remote'] == True, 'location_country'] = 'Remote'
     
+    # Resolve unique locations offline first: the bundled gazetteer, then answers from previous runs
+    locations = pd.Series(df[df['location_country'].isna()]['location'].unique(), dtype=object)
+    canonical = locations.map(canonicalize_location)
+    country_map = {}
+    for location, key in zip(locations, canonical):
+        country = gazetteer.lookup(key)
+        if country is not None:
+            country_map[location] = country
+    gazetteer_hits = len(country_map)
+    cached = location_cache.get_many(canonical[~locations.isin(country_map)])
+    country_map.update({location: cached[key] for location, key in zip(locations, canonical) if key in cached})
+    print(f"Unique locations: {len(locations)} ({gazetteer_hits} from gazetteer, {len(country_map) - gazetteer_hits} from cache)")
+
     # Get unique locations that need AI processing
-    locations_to_process = df[df['location_country'].isna()]['location'].unique()
+    locations_to_process = locations[~locations.isin(country_map)].tolist()
+    print(f"Locations to process with AI: {len(locations_to_process)}")
     
     if len(locations_to_process) > 0:
-        # Prepare batch of locations 
-        locations_str = "\n".join([f"- {loc}" for loc in locations_to_process])
-        prompt = f"""
+        llm_map = infer_countries_with_llm(locations_to_process)
+
+        # Remember real answers for the next runs; Unknown is retried next time instead of being frozen
+        location_cache.put_many({canonicalize_location(loc): country for loc, country in llm_map.items()
+                                 if country and country != 'Unknown'})
+        country_map.update(llm_map)
+
+    # Update DataFrame with inferred countries
+    df.loc[df['location_country'].isna(), 'location_country'] = \
+        df.loc[df['location_country'].isna(), 'location'].map(country_map)
+    
+    # Fill any remaining NAs with Unknown
+    df['location_country'] = df['location_country'].fillna('Unknown')
+    print('Locations inferred')
+    return df
+
+
+def location_prompt(locations: list) -> str:
+    locations_str = "\n".join([f"{i}: {loc}" for i, loc in enumerate(locations)])
+    return f"""
         For each location, return only its country name.
         Use standard country names (e.g., "United States" not "USA").
         If it's a city/state, return its country.
@@ -200,126 +563,204 @@ def infer_location(df):
         If it's a continent, return the continent.
         If it's unidentified, return "Unknown".
         
-        Locations:
+        Locations (index: location):
         {locations_str}
         
-        Format: location -> country
+        Format: a JSON object mapping every index to its country, e.g. {{"0": "United States"}}
         """
-        
-        # print(locations_str)
-        response = aiClient.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        # print(response.choices[0].message.content)
-
-        # Parse response and create mapping
-        country_map = {}
-        for line in response.choices[0].message.content.strip().split('\n'):
-            if '->' in line:
-                loc, country = line.split('->')
-                country_map[loc.strip().replace("- ", "")] = country.strip()
-        # print(country_map)
-        
-        # Update DataFrame with inferred countries
-        df.loc[df['location_country'].isna(), 'location_country'] = \
-            df.loc[df['location_country'].isna(), 'location'].map(country_map)
-    
-    # Fill any remaining NAs with Unknown
-    df['location_country'] = df['location_country'].fillna('Unknown')
-    print('Locations inferred')
-    return df
+
+
+def infer_location_chunk(locations: list) -> dict:
+    started = time.perf_counter()
+    response = aiClient.chat.completions.create(
+        model=LOCATION_MODEL,
+        messages=[{"role": "user", "content": location_prompt(locations)}],
+        response_format={"type": "json_object"}
+    )
+    answers = json.loads(response.choices[0].message.content)
+
+    # Keep only indexes that map back to a location in this chunk
+    countries = {}
+    for i, location in enumerate(locations):
+        country = answers.get(str(i))
+        if isinstance(country, str) and country.strip():
+            countries[location] = country.strip()
+    print(f"  Location chunk of {len(locations)} answered in {time.perf_counter() - started:.2f}s "
+          f"({len(countries)} parsed)")
+    return countries
+
+
+def infer_countries_with_llm(locations: list) -> dict:
+    # Send bounded-size chunks concurrently, then re-ask for any locations missing from the answers
+    country_map = {}
+    missing = list(locations)
+    for attempt in range(LOCATION_REASK_ROUNDS + 1):
+        chunks = [missing[i:i + LOCATION_CHUNK_SIZE] for i in range(0, len(missing), LOCATION_CHUNK_SIZE)]
+        results = run_concurrently(infer_location_chunk, chunks, LLM_MAX_CONCURRENCY, llm_rate_limiter,
+                                   estimate_tokens=lambda chunk: _estimate_tokens(location_prompt(chunk)) * 2)
+        for result in results:
+            country_map.update(result or {})
+        missing = [loc for loc in missing if loc not in country_map]
+        if not missing:
+            break
+        if attempt < LOCATION_REASK_ROUNDS:
+            print(f"Re-asking for {len(missing)} locations missing from the response")
+
+    if missing:
+        print(f"No answer for {len(missing)} locations; leaving them Unknown")
+    return country_map
 
     
+# Resorting to key words matching for now because LLM is insufficient and needs some fine tuning! 
+data_keywords = ["Data", "Analytics", "Data Scientist", "Data Engineer", "Data Analyst", 
+                 "Analytics Engineer", "Quantitative Researcher", "Business Intelligence"]
+
+engineering_keywords = ["Engineer", "developer", "DevOps", "Software", "Frontend", 
+                        "Backend", "Full Stack", "Blockchain", "Smart Contract",
+                        "solidity", "rust", "blockchain developer",
+                        "blockchain engineer",
+                        "Product", "Product Manager", "Product Owner", "Product Manager/Owner",
+                        "Research Engineer", "QA Engineer", 
+                        "Project Manager", "Technical Lead","Dev", "Cryptograph" ,
+                        "qa", "system"]
+
+business_keywords = ["Strategy", "Operations", "Sales", "Marketing",
+                     "Partnership", "Community", "Content", "Social Media",
+                     "Customer Success", "Account Management", "Legal", "Compliance",
+                     "HR", "People Operations", "Finance", "Accounting", "Administrative",
+                     "Support", "Officer","Solutions", "Copywriter", "account",
+                     "finance", "general", "executive", "financial", "tax", "treasury",
+                     "payroll", "writer", "Event", "recruit", "representative",
+                     "customer","auditor", "Business Development"]
+
+design_keywords = ["Designer", "Art", "Creative", "UI/UX", "Graphic",
+                   "Motion", "Visual",  "Animation", "3D", "Video"]
+
+# Match in priority order: Data -> Engineering -> Business -> Art
+# Each category is one precompiled alternation of its lowercased keywords (plain substring matching)
+job_function_patterns = [
+    (label, re.compile("|".join(re.escape(k) for k in sorted(set(k.lower() for k in keywords), key=len, reverse=True))))
+    for label, keywords in [
+        ("Data and Analytics", data_keywords),
+        ("Engineering, Product, and Research", engineering_keywords),
+        ("Business, Strategy, and Operations", business_keywords),
+        ("Design, Art, and Creative", design_keywords),
+    ]
+]
+
+# Keywords that also show up in unrelated titles ("product designer", "trust and safety", "smart");
+# a match on these alone gets a second opinion from the next tiers
+ambiguous_keywords = {"product", "dev", "system", "qa", "rust", "general", "account", "support", "officer",
+                      "solutions", "content", "executive", "hr", "art", "visual", "video", "motion", "3d"}
+job_function_strong_patterns = [
+    re.compile("|".join(re.escape(k) for k in sorted(set(k.lower() for k in keywords) - ambiguous_keywords,
+                                                    key=len, reverse=True)))
+    for keywords in [data_keywords, engineering_keywords, business_keywords, design_keywords]
+]
+
+
+def classify_titles_by_keywords(clean_title: pd.Series) -> np.ndarray:
+    conditions = [clean_title.str.contains(pattern, regex=True).values for _, pattern in job_function_patterns]
+    labels = [label for label, _ in job_function_patterns]
+    return np.select(conditions, labels, default="Unknown")
+
+
+def classify_titles_by_keywords_with_confidence(clean_title: pd.Series):
+    labels = classify_titles_by_keywords(clean_title)
+
+    # Full confidence when the winning category matched a specific keyword, lower when only ambiguous ones did
+    strong = np.select(
+        [labels == label for label, _ in job_function_patterns],
+        [clean_title.str.contains(pattern, regex=True).values for pattern in job_function_strong_patterns],
+        default=False,
+    )
+    confidences = np.where(labels == "Unknown", 0.0, np.where(strong, 1.0, KEYWORD_AMBIGUOUS_CONFIDENCE))
+    return labels, confidences
+
+
 def infer_job_function(df):
-    df['job_function'] = "Unknown"
     df['title'] = df['title'].fillna("").astype(str)
     df = df.reset_index(drop=True)
 
-    # Resorting to key words matching for now because LLM is insufficient and needs some fine tuning! 
-    # First use key words matching to infer job function
-    
-    data_keywords = ["Data", "Analytics", "Data Scientist", "Data Engineer", "Data Analyst", 
-                     "Analytics Engineer", "Quantitative Researcher", "Business Intelligence"]
-    data_keywords = set(k.lower() for k in data_keywords)
-
-    engineering_keywords = ["Engineer", "developer", "DevOps", "Software", "Frontend", 
-                            "Backend", "Full Stack", "Blockchain", "Smart Contract",
-                            "solidity", "rust", "blockchain developer",
-                            "blockchain engineer",
-                            "Product", "Product Manager", "Product Owner", "Product Manager/Owner",
-                            "Research Engineer", "QA Engineer", 
-                            "Project Manager", "Technical Lead","Dev", "Cryptograph" ,
-                            "qa", "system"]
-    engineering_keywords = set(k.lower() for k in engineering_keywords)
-
-    business_keywords = ["Strategy", "Operations", "Sales", "Marketing",
-                        "Partnership", "Community", "Content", "Social Media",
-                         "Customer Success", "Account Management", "Legal", "Compliance",
-                         "HR", "People Operations", "Finance", "Accounting", "Administrative",
-                         "Support", "Officer","Solutions", "Copywriter", "account",
-                         "finance", "general", "executive", "financial", "tax", "treasury",
-                         "payroll", "writer", "Event", "recruit", "representative",
-                         "customer","auditor", "Business Development"]
-    business_keywords = set(k.lower() for k in business_keywords)
-    
-    design_keywords = ["Designer", "Art", "Creative", "UI/UX", "Graphic",
-                       "Motion", "Visual",  "Animation", "3D", "Video"]
-    design_keywords = set(k.lower() for k in design_keywords)
-
-    
-    for index, row in df.iterrows():
-        # Clean the title 
-        title = row['title'].lower()
-        title = re.sub(r"\s*\(.*?\)", "", title).strip()
-        title = title.replace("(", "").replace(")", "").strip()
-        title = title.replace("/", "").strip()
-        title = title.split(",")[0]
-        title = title.split("-")[0]
-
-        # Match in priority order: Data -> Engineering -> Business -> Art
-        if any(keyword in title for keyword in data_keywords):
-            df.loc[index, 'job_function'] = "Data and Analytics"
-        elif any(keyword in title for keyword in engineering_keywords):
-            df.loc[index, 'job_function'] = "Engineering, Product, and Research"
-        elif any(keyword in title for keyword in business_keywords):
-            df.loc[index, 'job_function'] = "Business, Strategy, and Operations"
-        elif any(keyword in title for keyword in design_keywords):
-            df.loc[index, 'job_function'] = "Design, Art, and Creative"
-        else:
-            df.loc[index, 'job_function'] = "Unknown"
-
-    jobs_to_process = df[df['job_function'] == "Unknown"]
-    jobs_to_process = jobs_to_process.reset_index(drop=True)
-    print(f"Jobs to process with AI: {len(jobs_to_process)}")
-
-    for index, row in jobs_to_process.iterrows():
-        # Clean the title 
-        title = row['title'].lower()
-        title = re.sub(r"\s*\(.*?\)", "", title).strip()
-        title = title.replace("(", "").replace(")", "").strip()
-        title = title.replace("/", "").strip()
-        title = title.split(",")[0]
-        title = title.split("-")[0]
-
-        response = aiClient.chat.completions.create(
-            model="ft:gpt-3.5-turbo-0125:personal::BDiM7gWS",
-            messages=[
-                {"role": "user", "content": f"Job Title: {title} \n\nJob Function:"}
-            ]
-        )
-        jobs_to_process.loc[index, 'job_function'] = response.choices[0].message.content.strip()
-
-    # Combine the processed jobs with the rest of the dataframe
-    df = pd.concat([df[df['job_function'] != "Unknown"], jobs_to_process]).reset_index(drop=True)
+    # Classify each unique cleaned title once and broadcast the results back to the rows
+    title_codes, unique_titles = pd.factorize(clean_titles(df['title']))
+    unique_titles = pd.Series(unique_titles, dtype=object)
+    print(f"Unique titles: {len(unique_titles)} of {len(df)} jobs "
+          f"({len(df) - len(unique_titles)} classifications saved)")
+
+    # Only the low-confidence residue of each tier reaches the next one, and finally the paid model
+    tiers = [
+        CascadeTier("keywords", classify_titles_by_keywords_with_confidence, KEYWORD_MIN_CONFIDENCE),
+        CascadeTier("cache", classify_titles_from_cache, 1.0),
+    ]
+    if job_function_model is not None:
+        tiers.append(CascadeTier("local_model", lambda titles: predict_job_functions(job_function_model, titles),
+                                 LOCAL_MODEL_MIN_CONFIDENCE))
+    tiers.append(CascadeTier("llm", classify_titles_with_model, 0.0, LLM_COST_PER_TITLE_USD))
+
+    unique_functions, stats = run_cascade(unique_titles, tiers, job_function_list)
+    print("\n=== Job Function Cascade ===")
+    print(stats.to_string(index=False))
+    # Compare against the keyword-only path, where every title without a keyword match went to the LLM
+    llm_titles = stats.loc[stats['tier'] == 'llm', 'titles_in'].sum()
+    baseline_llm_titles = (classify_titles_by_keywords(unique_titles) == "Unknown").sum()
+    print(f"Estimated LLM cost: ${llm_titles * LLM_COST_PER_TITLE_USD:.4f} for {llm_titles} titles, "
+          f"keyword-only baseline: ${baseline_llm_titles * LLM_COST_PER_TITLE_USD:.4f} for {baseline_llm_titles} titles, "
+          f"avoided: ${(baseline_llm_titles - llm_titles) * LLM_COST_PER_TITLE_USD:.4f}")
+
+    df['job_function'] = unique_functions.values[title_codes]
     print("Unknown:", len(df[df['job_function'] == "Unknown"]))
 
-    job_function_list = ['Engineering, Product, and Research', 'Business, Strategy, and Operations', 'Data and Analytics', 'Design, Art, and Creative']
     df['job_function'] = df['job_function'].apply(lambda x: x if x in job_function_list else 'Unknown')
     # df = df[df['job_function'] != 'Unknown']
 
     return df
 
+
+def classify_titles_from_cache(titles: pd.Series):
+    # Reuse answers the fine-tuned model gave for the same title in previous runs
+    cached = classification_cache.get_many(titles)
+    print(f"Job function cache: {len(cached)} hits, {len(titles) - len(cached)} misses")
+    labels = titles.map(cached).fillna("Unknown")
+    return labels.values, np.where(titles.isin(cached), 1.0, 0.0)
+
+
+def classify_titles_with_model(titles: pd.Series):
+    # Send the titles to the fine-tuned model concurrently; answers come back in title order
+    answers = run_concurrently(classify_title_with_model, titles.tolist(), LLM_MAX_CONCURRENCY,
+                               llm_rate_limiter, estimate_tokens=lambda title: _estimate_tokens(title) + 20)
+    labels = pd.Series([answer or "Unknown" for answer in answers], index=titles.index, dtype=object)
+
+    # Only cache valid answers so malformed ones are retried next run
+    valid = labels.isin(job_function_list)
+    classification_cache.put_many(dict(zip(titles[valid], labels[valid])))
+    return labels.values, np.where(valid, 1.0, 0.0)
+
+
+def classify_title_with_model(title: str) -> str:
+    response = aiClient.chat.completions.create(
+        model=JOB_FUNCTION_MODEL,
+        messages=[
+            {"role": "user", "content": f"Job Title: {title} \n\nJob Function:"}
+        ]
+    )
+    return response.choices[0].message.content.strip()
+
+
+def warm_classification_cache(cache: ClassificationCache, page_size=1000):
+    # Seed the cache with titles already labelled in jobs_clean, so most model calls disappear after the first run
+    history = get_labelled_jobs(supabase, page_size)
+    history["clean_title"] = clean_titles(history["title"])
+
+    # Only titles with no keyword match: the stored labels of keyword matches (ambiguous ones included)
+    # came from the keyword pass itself and must not skip the local model and the LLM
+    history = history[classify_titles_by_keywords(history["clean_title"]) == "Unknown"]
+    labels = history.groupby("clean_title")["job_function"].agg(lambda x: x.value_counts().index[0])
+    labels = labels.drop([title for title in labels.index if title in cache.labels])
+    cache.put_many(labels.to_dict(), origin="jobs_clean")
+    print(f"Warmed job function cache with {len(labels)} titles from jobs_clean")
+
+
 def clean_data(df):
 
     # Convert string representation of a list into an actual list
@@ -327,9 +768,9 @@ def clean_data(df):
 
     # Add ingestion date and job ids
     df['ingestion_date'] = pd.Timestamp.now().strftime('%Y-%m-%d')
+    df['my_id'] = make_my_id(df)
     df['job_id'] = pd.to_numeric(df['job_id'], errors='coerce').astype("Int64")
     df['posted_datetime'] = pd.to_datetime(df['posted_datetime'], errors='coerce').dt.strftime('%Y-%m-%d')
-    df['my_id'] = df['posted_datetime'].astype(str) + "-" + df['job_id'].astype(str)
 
     # Replace infinities with None
     df['salary_amount'] = df['salary_amount'].replace([np.inf, -np.inf], pd.NA)  
@@ -344,33 +785,6 @@ def clean_data(df):
     
     return df
 
-def _json_safe_value(value):
-    if value is None:
-        return None
-    if isinstance(value, (list, dict, str, int, bool)):
-        return value
-    if isinstance(value, float):
-        return None if np.isnan(value) else value
-    if isinstance(value, (pd.Timestamp, np.datetime64)):
-        ts = pd.Timestamp(value)
-        return None if pd.isna(ts) else ts.strftime('%Y-%m-%d')
-    if isinstance(value, (np.integer, np.floating)):
-        return None if pd.isna(value) else value.item()
-    if isinstance(value, np.bool_):
-        return bool(value)
-    if pd.api.types.is_scalar(value) and pd.isna(value):
-        return None
-    return value
-
-
-def _json_safe_records(df: pd.DataFrame) -> list:
-    records = df.to_dict(orient="records")
-    for record in records:
-        for key in record:
-            record[key] = _json_safe_value(record[key])
-    return records
-
-
 def upload_to_supabase(df, table_name: str):
     print(f"dataframe size: {len(df)}")
     df = df.drop_duplicates(subset=['my_id'], keep='last')
@@ -380,43 +794,79 @@ def upload_to_supabase(df, table_name: str):
         print("No records to upload")
         return None
 
-    records = _json_safe_records(df)
-
-    BATCH_SIZE = 100
-    for i in range(0, len(records), BATCH_SIZE):
-        batch = records[i:i + BATCH_SIZE]
-        supabase.table(table_name).upsert(batch, on_conflict="my_id").execute()
-        print(f"  Uploaded batch {i // BATCH_SIZE + 1} ({len(batch)} records)")
+    records = json_safe_records(df)
+    # Only jobs that are new or whose content changed are written; the rest get ingestion_date refreshed
+    bulk_writer.upsert_changed(table_name, records, key_column="my_id", on_conflict="my_id")
 
     return None
 
-def get_job_latest_data(table_name: str) -> pd.DataFrame:
+def get_job_latest_data(table_name: str, page_size=LATEST_DATA_PAGE_SIZE) -> pd.DataFrame:
     thirty_days_ago = (pd.Timestamp.now() - pd.Timedelta(days=30)).strftime('%Y-%m-%d')
+
+    # Find the most recent scrape batch on the server instead of downloading 30 days of rows
     response = (
         supabase.table(table_name)
-        .select('*')
-        .gte('ingestion_date', thirty_days_ago)  
+        .select('ingestion_date')
+        .gte('ingestion_date', thirty_days_ago)
+        .order('ingestion_date', desc=True)
+        .limit(1)
         .execute()
     )
-    df = pd.DataFrame(response.data)
-
-    if df.empty or 'ingestion_date' not in df.columns:
+    if not response.data:
         print(f"No data found for {table_name}")
         return pd.DataFrame()
-
-    df['ingestion_date'] = pd.to_datetime(df['ingestion_date'], errors='coerce')
-    latest_ingestion = df['ingestion_date'].max()
+    latest_ingestion = response.data[0]['ingestion_date']
     print(f"Latest ingestion date: {latest_ingestion}")
 
-    # Incremental: only jobs from the most recent scrape batch
-    df = df[df['ingestion_date'] == latest_ingestion]
+    response = (
+        supabase.table(table_name)
+        .select('ingestion_date', count='exact')
+        .eq('ingestion_date', latest_ingestion)
+        .limit(1)
+        .execute()
+    )
+    total = response.count or 0
+
+    # Page through the batch with range requests, writing each page into a preallocated array.
+    # A stable order keeps pages from overlapping; stop early if the batch shrank meanwhile.
+    values = np.empty((total, len(SOURCE_COLUMNS)), dtype=object)
+    filled = 0
+    page = 0
+    while filled < total:
+        started = time.perf_counter()
+        response = (
+            supabase.table(table_name)
+            .select(', '.join(SOURCE_COLUMNS))
+            .eq('ingestion_date', latest_ingestion)
+            .order('job_url')
+            .order('job_id')
+            .range(filled, min(filled + page_size, total) - 1)
+            .execute()
+        )
+        rows = response.data
+        for i, row in enumerate(rows):
+            values[filled + i] = [row.get(column) for column in SOURCE_COLUMNS]
+        filled += len(rows)
+        page += 1
+        print(f"  Page {page}: {len(rows)} rows "
+              f"in {time.perf_counter() - started:.2f}s ({filled}/{total})")
+        if len(rows) == 0:
+            break
+
+    df = pd.DataFrame(values[:filled], columns=SOURCE_COLUMNS).infer_objects()
     print(f"Rows from latest ingestion batch: {len(df)}")
 
-    if 'posted_datetime' in df.columns:
-        df['posted_datetime'] = pd.to_datetime(df['posted_datetime'], errors='coerce')
-        df = df.sort_values(by='posted_datetime', ascending=False)
+    return prepare_source_data(df)
 
-    return df
+
+def prepare_source_data(df: pd.DataFrame) -> pd.DataFrame:
+    # Parse the date columns of a cleaned source frame and put the newest postings first
+    if df.empty:
+        return df
+    df = df.copy()
+    df['ingestion_date'] = pd.to_datetime(df['ingestion_date'], errors='coerce')
+    df['posted_datetime'] = pd.to_datetime(df['posted_datetime'], errors='coerce')
+    return df.sort_values(by='posted_datetime', ascending=False)
 
 if __name__ == "__main__":
     main()
@@ -7,6 +7,7 @@ from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import ast
 import re
+import json
 
 
 # Load environment variables
@@ -21,6 +22,10 @@ aiClient= OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
 job_sources = ["web3career", "cryptojobscom"]  
 
+# Titles per batched classification request, and the prompt size each batch must stay under
+JOB_FUNCTION_BATCH_SIZE = 50
+JOB_FUNCTION_MAX_PROMPT_TOKENS = 8000
+
 def main():
 
     # Get job data from supabase
@@ -204,7 +209,154 @@ def infer_location(df):
     return df
 
     
-def infer_job_function(df):
+job_function_instructions = """
+        You are an expert HR professional specializing in Web3 and blockchain industry job classifications.
+        Focus on the core role/function and ignore modifiers like "Senior", "Lead", "Junior", "Head of", "Director", etc.
+
+        ### Job Function Categories:
+
+        1. Engineering, Product, and Research
+           - Any Software Engineering role (Frontend, Backend, Full Stack)
+           - Blockchain Developer/Engineer
+           - Smart Contract Developer/Engineer
+           - Protocol Engineer
+           - Security Engineer
+           - DevOps Engineer
+           - Technical Lead/Architect
+           - Product Manager/Owner
+           - Research Engineer
+           - QA Engineer
+           - Solutions Engineer
+
+        2. Business, Strategy, and Operations
+           - Business Development
+           - Operations
+           - Project Manager
+           - Account Manager
+           - Community Manager
+           - Program Manager
+           - Legal/Compliance
+           - HR/People Operations
+           - Finance/Accounting
+           - Administrative/Support
+
+        3. Data and Analytics
+           - Data Scientist
+           - Data Engineer
+           - Data Analyst
+           - Business Intelligence
+           - Quantitative Researcher
+           - Analytics Engineer
+
+        4. Design, Art, and Creative
+           - UI/UX Designer
+           - Product Designer
+           - Graphic Designer
+           - Creative Director
+           - Motion Designer
+           - Web Designer
+
+"""
+
+job_function_list = ['Engineering, Product, and Research', 'Business, Strategy, and Operations', 'Data and Analytics', 'Design, Art, and Creative']
+
+
+def job_function_prompt(title):
+    return job_function_instructions + f"""        Job Title to Categorize: {title}
+
+        Output Format: Return ONLY the category name of one of the following:
+        Engineering, Product, and Research
+        Business, Strategy, and Operations
+        Data and Analytics
+        Design, Art, and Creative
+        """
+
+
+def batch_job_function_prompt(titles):
+    titles_str = "\n".join([f"        {i}: {title}" for i, title in enumerate(titles)])
+    return job_function_instructions + f"""        Job Titles to Categorize (index: title):
+{titles_str}
+
+        Output Format: Return ONLY a JSON object mapping every index to the category name, e.g. {{"0": "Data and Analytics"}}.
+        Each category name must be exactly one of the following:
+        Engineering, Product, and Research
+        Business, Strategy, and Operations
+        Data and Analytics
+        Design, Art, and Creative
+        """
+
+
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token)
+    return len(text) // 4
+
+
+def classify_title(title):
+    response = aiClient.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": job_function_prompt(title)}]
+    )
+    return response.choices[0].message.content.strip()
+
+
+def job_function_batches(titles, batch_size, max_prompt_tokens):
+    # Split titles into batches of at most batch_size that keep the prompt within max_prompt_tokens
+    base_tokens = estimate_tokens(batch_job_function_prompt([]))
+    batch = []
+    batch_tokens = base_tokens
+    for i, title in enumerate(titles):
+        title_tokens = estimate_tokens(f"        {i}: {title}\n") + 1
+        if batch and (len(batch) >= batch_size or batch_tokens + title_tokens > max_prompt_tokens):
+            yield batch
+            batch = []
+            batch_tokens = base_tokens
+        batch.append(i)
+        batch_tokens += title_tokens
+    if batch:
+        yield batch
+
+
+def classify_titles_batched(titles, batch_size=JOB_FUNCTION_BATCH_SIZE, max_prompt_tokens=JOB_FUNCTION_MAX_PROMPT_TOKENS):
+    results = [None] * len(titles)
+    prompt_tokens = 0
+    request_count = 0
+
+    for batch in job_function_batches(titles, batch_size, max_prompt_tokens):
+        prompt = batch_job_function_prompt([titles[i] for i in batch])
+        prompt_tokens += estimate_tokens(prompt)
+        request_count += 1
+        try:
+            response = aiClient.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"}
+            )
+            answers = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Batch classification failed ({len(batch)} titles): {e}")
+            answers = {}
+
+        # Keep only indexes that came back with one of the allowed categories
+        for position, i in enumerate(batch):
+            answer = answers.get(str(position)) if isinstance(answers, dict) else None
+            if isinstance(answer, str) and answer.strip() in job_function_list:
+                results[i] = answer.strip()
+
+    # Retry missing or invalid items individually
+    retries = [i for i, result in enumerate(results) if result is None]
+    for i in retries:
+        results[i] = classify_title(titles[i])
+    single_prompt_tokens = [estimate_tokens(job_function_prompt(title)) for title in titles]
+    prompt_tokens += sum(single_prompt_tokens[i] for i in retries)
+
+    tokens_saved = sum(single_prompt_tokens) - prompt_tokens
+    print(f"Batched classification: {len(titles)} titles in {request_count} batch requests, "
+          f"{len(retries)} retried individually")
+    print(f"Estimated prompt tokens: {prompt_tokens} ({tokens_saved} saved vs one request per title)")
+    return results
+
+
+def infer_job_function(df, batch_size=JOB_FUNCTION_BATCH_SIZE):
     df['job_function'] = "Unknown"
     df = df.reset_index(drop=True)
 
@@ -265,77 +417,22 @@ def infer_job_function(df):
     jobs_to_process = jobs_to_process.reset_index(drop=True)
     print(f"Jobs to process with AI: {len(jobs_to_process)}")
 
+    # Clean the titles
+    titles = []
     for index, row in jobs_to_process.iterrows():
-        # Clean the title 
         title = row['title'].lower()
         title = re.sub(r"\s*\(.*?\)", "", title).strip()
         title = title.replace("(", "").replace(")", "").strip()
         title = title.replace("/", "").strip()
         title = title.split(",")[0]
         title = title.split("-")[0]
-        # print(title)
-
-        prompt = f"""
-        You are an expert HR professional specializing in Web3 and blockchain industry job classifications.
-        Focus on the core role/function and ignore modifiers like "Senior", "Lead", "Junior", "Head of", "Director", etc.
+        titles.append(title)
 
-        ### Job Function Categories:
-
-        1. Engineering, Product, and Research
-           - Any Software Engineering role (Frontend, Backend, Full Stack)
-           - Blockchain Developer/Engineer
-           - Smart Contract Developer/Engineer
-           - Protocol Engineer
-           - Security Engineer
-           - DevOps Engineer
-           - Technical Lead/Architect
-           - Product Manager/Owner
-           - Research Engineer
-           - QA Engineer
-           - Solutions Engineer
-
-        2. Business, Strategy, and Operations
-           - Business Development
-           - Operations
-           - Project Manager
-           - Account Manager
-           - Community Manager
-           - Program Manager
-           - Legal/Compliance
-           - HR/People Operations
-           - Finance/Accounting
-           - Administrative/Support
-
-        3. Data and Analytics
-           - Data Scientist
-           - Data Engineer
-           - Data Analyst
-           - Business Intelligence
-           - Quantitative Researcher
-           - Analytics Engineer
-
-        4. Design, Art, and Creative
-           - UI/UX Designer
-           - Product Designer
-           - Graphic Designer
-           - Creative Director
-           - Motion Designer
-           - Web Designer
-
-        Job Title to Categorize: {title}
-
-        Output Format: Return ONLY the category name of one of the following:
-        Engineering, Product, and Research
-        Business, Strategy, and Operations
-        Data and Analytics
-        Design, Art, and Creative
-        """
-
-        response = aiClient.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        jobs_to_process.loc[index, 'job_function'] = response.choices[0].message.content.strip()
+    if batch_size and batch_size > 1:
+        jobs_to_process['job_function'] = classify_titles_batched(titles, batch_size)
+    else:
+        for index, title in enumerate(titles):
+            jobs_to_process.loc[index, 'job_function'] = classify_title(title)
 
     # Combine the processed jobs with the rest of the dataframe
     jobs_to_process['job_function'].replace("- ", "", inplace=True)
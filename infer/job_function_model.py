@@ -0,0 +1,119 @@
+import os
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from supabase import create_client
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+
+JOB_FUNCTION_MODEL_PATH = os.getenv("JOB_FUNCTION_MODEL_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "models", "job_function.joblib"))
+job_function_list = ['Engineering, Product, and Research', 'Business, Strategy, and Operations', 'Data and Analytics', 'Design, Art, and Creative']
+
+
+def clean_titles(titles: pd.Series) -> pd.Series:
+    # Lowercase, drop parentheticals and slashes, and keep the part before the first comma and dash
+    titles = titles.fillna("").astype(str).str.lower()
+    titles = titles.str.replace(r"\s*\(.*?\)", "", regex=True).str.strip()
+    titles = titles.str.replace("(", "", regex=False).str.replace(")", "", regex=False).str.strip()
+    titles = titles.str.replace("/", "", regex=False).str.strip()
+    titles = titles.str.split(",").str[0]
+    titles = titles.str.split("-").str[0]
+    return titles
+
+
+def build_model() -> Pipeline:
+    # Word and character n-gram TF-IDF features feeding a linear classifier
+    features = FeatureUnion([
+        ("word", TfidfVectorizer(analyzer="word", ngram_range=(1, 2), sublinear_tf=True)),
+        ("char", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True)),
+    ])
+    return Pipeline([
+        ("features", features),
+        ("classifier", LogisticRegression(max_iter=1000, C=5.0, class_weight="balanced")),
+    ])
+
+
+def train_job_function_model(titles: pd.Series, labels: pd.Series, test_size: float = 0.2):
+    """Fit the model on cleaned titles, printing held-out accuracy, then refit on all rows"""
+    titles = clean_titles(titles)
+    if test_size and len(titles) >= 50:
+        train_titles, test_titles, train_labels, test_labels = train_test_split(
+            titles, labels, test_size=test_size, random_state=0, stratify=labels)
+        model = build_model().fit(train_titles, train_labels)
+        print(f"Held-out accuracy: {(model.predict(test_titles) == test_labels).mean():.2%} on {len(test_titles)} titles")
+    return build_model().fit(titles, labels)
+
+
+def save_job_function_model(model: Pipeline, path: str = JOB_FUNCTION_MODEL_PATH, n_samples: int = None) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump({
+        "model": model,
+        "trained_at": pd.Timestamp.now().isoformat(),
+        "n_samples": n_samples,
+    }, path)
+    print(f"Saved job function model to {path}")
+
+
+def load_job_function_model(path: str = JOB_FUNCTION_MODEL_PATH):
+    if not os.path.exists(path):
+        print(f"No local job function model at {path}; skipping local classification")
+        return None
+    artifact = joblib.load(path)
+    print(f"Loaded local job function model trained {artifact['trained_at']} on {artifact['n_samples']} titles")
+    return artifact["model"]
+
+
+def predict_job_functions(model: Pipeline, clean_title: pd.Series):
+    """Return (labels, confidences) for already-cleaned titles"""
+    if len(clean_title) == 0:
+        return np.array([], dtype=object), np.array([], dtype=float)
+    probabilities = model.predict_proba(clean_title)
+    best = probabilities.argmax(axis=1)
+    return model.classes_[best], probabilities[np.arange(len(best)), best]
+
+
+def get_labelled_jobs(supabase, page_size: int = 1000) -> pd.DataFrame:
+    rows = []
+    start = 0
+    while True:
+        response = (
+            supabase.table("jobs_clean")
+            .select("title, job_function")
+            .order("my_id")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            break
+        start += page_size
+    df = pd.DataFrame(rows, columns=["title", "job_function"])
+    return df[df["job_function"].isin(job_function_list)]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Train the local job function model from labelled rows in jobs_clean')
+    parser.add_argument('--output', default=JOB_FUNCTION_MODEL_PATH, help='Where to save the trained model')
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+    df = get_labelled_jobs(supabase)
+    print(f"Loaded {len(df)} labelled jobs")
+    print(df["job_function"].value_counts().to_string())
+
+    model = train_job_function_model(df["title"], df["job_function"])
+    save_job_function_model(model, args.output, n_samples=len(df))
+
+
+if __name__ == "__main__":
+    main()
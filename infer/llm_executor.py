@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateLimiter:
+    """
+    Thread-safe token buckets for requests per minute and tokens per minute.
+    acquire() blocks until both buckets can cover the call.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float = None):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = {name: limit for name, limit in self.limits.items() if limit}
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for name in self.available:
+            self.available[name] = min(self.limits[name], self.available[name] + elapsed * self.limits[name] / 60)
+
+    def acquire(self, tokens: int = 0):
+        cost = {"requests": 1, "tokens": tokens}
+        while True:
+            with self.lock:
+                self._refill()
+                # A single call larger than the bucket only waits for a full bucket
+                needed = {name: min(cost[name], self.limits[name]) for name in self.available}
+                if all(self.available[name] >= needed[name] for name in self.available):
+                    for name in self.available:
+                        self.available[name] -= needed[name]
+                    return
+                wait = max((needed[name] - self.available[name]) * 60 / self.limits[name]
+                           for name in self.available)
+            time.sleep(wait)
+
+
+def run_concurrently(func, items: list, max_workers: int = 8, rate_limiter: RateLimiter = None,
+                     estimate_tokens=None, retries: int = 3, base_delay: float = 1.0) -> list:
+    """
+    Call func(item) for every item on a bounded thread pool, retrying each call with
+    jittered exponential backoff. Results come back in input order; items that still
+    fail after all retries get None.
+    """
+
+    def call(position, item):
+        for attempt in range(retries):
+            if rate_limiter is not None:
+                rate_limiter.acquire(estimate_tokens(item) if estimate_tokens else 0)
+            try:
+                return func(item)
+            except Exception as e:
+                if attempt < retries - 1:
+                    wait = base_delay * 2 ** attempt * random.uniform(0.5, 1.5)
+                    print(f"API error on item {position} (attempt {attempt + 1}/{retries}): {e}, retrying in {wait:.1f}s...")
+                    time.sleep(wait)
+                else:
+                    print(f"API failed on item {position} after {retries} attempts: {e}")
+        return None
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call, range(len(items)), items))
@@ -0,0 +1,60 @@
+import csv
+import os
+import re
+
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+
+# Work-arrangement words that say nothing about the place
+_NOISE_WORDS = r"\b(hybrid|on-site|onsite|on site|in-office|office|relocation|only|based|area|metro|greater|region)\b"
+
+
+def canonicalize_location(location: str) -> str:
+    """Lowercase, unify separators into commas, and drop work-arrangement noise and extra whitespace"""
+    location = str(location).lower()
+    location = re.sub(r"\(.*?\)", " ", location)
+    location = re.sub(r"[/|;•·]", ",", location)
+    location = re.sub(_NOISE_WORDS, " ", location)
+    location = re.sub(r"[^\w\s,.'-]", " ", location)
+    parts = [" ".join(part.split()).strip(" .-") for part in location.split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+class Gazetteer:
+    """
+    Offline lookup of canonical location strings against the bundled table of countries,
+    aliases, continents, states/provinces and major cities.
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.names = {}
+        self.state_codes = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["kind"] == "state_code":
+                    self.state_codes[row["name"]] = row["country"]
+                else:
+                    self.names[row["name"]] = row["country"]
+
+    def lookup(self, canonical: str):
+        """Country for a canonical location string, or None when unknown or ambiguous"""
+        if not canonical:
+            return None
+        if canonical in self.names:
+            return self.names[canonical]
+
+        parts = canonical.split(", ")
+        countries = set()
+        for part in parts:
+            if part in self.names:
+                countries.add(self.names[part])
+            elif part in self.state_codes:
+                # Many state codes are also country codes ("Leipzig, DE", "Kochi, IN"), so a code only
+                # counts next to a known place of the same country ("Austin, TX", "New York, NY, USA");
+                # anything else is left to the cache and the LLM
+                known_countries = {self.names[other] for other in parts if other in self.names}
+                if known_countries != {self.state_codes[part]}:
+                    return None
+        if len(countries) == 1:
+            return countries.pop()
+        return None
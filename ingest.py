@@ -1,7 +1,13 @@
 import os
 import sys
+import time
+import argparse
 import subprocess
 import logging
+import importlib
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Configure logging
 logging.basicConfig(
@@ -42,48 +48,222 @@ python_scripts.append({
     })
 
 
-# Track overall success
-success = True
-
-# Run all scripts 
-for script_info in python_scripts:
-    script_name = script_info["script"]
-    script_args = script_info["args"]
-    is_critical = script_info.get("critical", False)
-    
-    command = ['python', script_name] + script_args
-    logger.info(f"Running: {' '.join(command)}")
-    
-    try:
-        # Run the subprocess with stdout and stderr directed to the parent process
-        # This allows real-time logging while still capturing the return code
-        result = subprocess.run(command, check=False)
-        
-        if result.returncode == 0:
-            logger.info(f"Successfully finished {script_name}")
-        else:
-            logger.error(f"Error running {script_name}, return code: {result.returncode}")
-            
+# Stages of the in-process pipeline: each gets the outputs of its dependencies as arguments
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Stages allowed to run at the same time; the per-source fetch -> clean branches are independent
+max_parallel_stages = 2
+fetcher_classes = {"web3career": "Web3CareerFetcher", "cryptojobscom": "CryptoJobsComFetcher"}
+pipeline_stages = []
+
+for source in job_sources:
+    pipeline_stages.append({
+        "name": f"fetch_{source}",
+        "func": lambda source=source: run_fetch(source),
+        "deps": [],
+        "critical": True
+    })
+
+for source in job_sources:
+    pipeline_stages.append({
+        "name": f"clean_{source}",
+        "func": lambda jobs, source=source: run_clean(source, jobs),
+        "deps": [f"fetch_{source}"],
+        "critical": True
+    })
+
+pipeline_stages.append({
+        "name": "infer",
+        "func": lambda *clean_dfs: run_infer(clean_dfs),
+        "deps": [f"clean_{source}" for source in job_sources],
+        "critical": True
+    })
+
+
+# Stage modules are imported once, and Chrome drivers are set up one at a time
+module_lock = threading.Lock()
+driver_setup_lock = threading.Lock()
+
+
+def load_stage_module(name: str, path: str):
+    # Import a pipeline script as a module; infer-mixed.py has a hyphen, so go through its path
+    with module_lock:
+        if name not in sys.modules:
+            spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT_DIR, path))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[name] = module
+        return sys.modules[name]
+
+
+def run_fetch(source: str) -> list:
+    module = load_stage_module(f"fetch_{source}", f"scrape/fetch_{source}.py")
+    # Outside GitHub Actions the fetchers reinstall ChromeDriver, which must not happen twice at once
+    with driver_setup_lock:
+        fetcher = getattr(module, fetcher_classes[source])()
+    return getattr(module, f"fetch_{source}_jobs")(max_pages, fetcher)
+
+
+def run_clean(source: str, jobs: list):
+    module = load_stage_module(f"clean_{source}", f"scrape/clean_{source}.py")
+    print(f"Loaded {len(jobs)} jobs")
+    return module.clean_and_upload_jobs(jobs)
+
+
+def run_infer(clean_dfs: tuple):
+    module = load_stage_module("infer_mixed", "infer/infer-mixed.py")
+    args = module.build_arg_parser().parse_args([])
+    # The cleaned frames come straight from the clean stages instead of a re-read of the source tables
+    dfs = [module.prepare_source_data(df) for df in clean_dfs]
+    return module.process_jobs(dfs, args)
+
+
+def run_stage(stage: dict, inputs: list):
+    started = time.perf_counter()
+    result = stage["func"](*inputs)
+    return result, started, time.perf_counter()
+
+
+def run_in_process_pipeline(stages: list, max_parallel: int = max_parallel_stages) -> bool:
+    # Stage modules import their helpers by plain name, as they do when run as scripts
+    for directory in ["scrape", "infer"]:
+        sys.path.append(os.path.join(ROOT_DIR, directory))
+
+    results = {}
+    failed = set()
+    timings = {}
+    success = True
+    pipeline_started = time.perf_counter()
+    waiting = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while waiting or running:
+            # Start every stage whose dependencies are done, up to the parallelism limit
+            for stage in list(waiting):
+                stage_name = stage["name"]
+                missing = [dep for dep in stage["deps"] if dep in failed]
+                if missing:
+                    waiting.remove(stage)
+                    failed.add(stage_name)
+                    logger.error(f"Skipping {stage_name}: upstream stage {', '.join(missing)} failed")
+                    if stage.get("critical", False):
+                        logger.critical(f"Critical stage {stage_name} cannot run - stopping pipeline")
+                        success = False
+                elif success and len(running) < max_parallel and all(dep in results for dep in stage["deps"]):
+                    waiting.remove(stage)
+                    logger.info(f"Running stage: {stage_name}")
+                    future = executor.submit(run_stage, stage, [results[dep] for dep in stage["deps"]])
+                    running[future] = stage
+
+            if not success:
+                # Let the stages already running finish, but start nothing new
+                waiting.clear()
+            if not running:
+                if waiting:
+                    logger.critical(f"Stages {', '.join(stage['name'] for stage in waiting)} depend on unknown stages - stopping pipeline")
+                    success = False
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                stage_name = stage["name"]
+                is_critical = stage.get("critical", False)
+                try:
+                    results[stage_name], started, ended = future.result()
+                    timings[stage_name] = (started - pipeline_started, ended - pipeline_started)
+                    logger.info(f"Successfully finished {stage_name} in {ended - started:.1f}s")
+                except Exception as e:
+                    logger.error(f"Exception while running {stage_name}: {e}", exc_info=e)
+                    failed.add(stage_name)
+
+                    if is_critical:
+                        logger.critical(f"Critical stage {stage_name} failed - stopping pipeline")
+                        success = False
+                    else:
+                        logger.warning(f"Non-critical stage {stage_name} failed - continuing with next stage")
+
+    print_stage_timeline(timings, failed, time.perf_counter() - pipeline_started)
+    return success
+
+
+def print_stage_timeline(timings: dict, failed: set, total: float, width: int = 50):
+    # Gantt-style chart: one bar per stage over the wall-clock time of the run
+    print(f"\n=== Stage Timeline (total {total:.1f}s) ===")
+    name_width = max([len(name) for name in list(timings) + list(failed)] or [0])
+    for name, (started, ended) in sorted(timings.items(), key=lambda item: item[1]):
+        first = int(started / total * width) if total else 0
+        last = max(first + 1, int(round(ended / total * width))) if total else width
+        bar = "." * first + "#" * (last - first) + "." * (width - last)
+        print(f"{name:<{name_width}} |{bar}| {started:7.1f}s - {ended:7.1f}s ({ended - started:.1f}s)")
+    for name in sorted(failed):
+        print(f"{name:<{name_width}} |{' ' * width}| failed or skipped")
+
+
+def run_subprocess_pipeline(python_scripts: list) -> bool:
+    # Track overall success
+    success = True
+
+    # Run all scripts 
+    for script_info in python_scripts:
+        script_name = script_info["script"]
+        script_args = script_info["args"]
+        is_critical = script_info.get("critical", False)
+
+        command = ['python', script_name] + script_args
+        logger.info(f"Running: {' '.join(command)}")
+
+        try:
+            # Run the subprocess with stdout and stderr directed to the parent process
+            # This allows real-time logging while still capturing the return code
+            result = subprocess.run(command, check=False)
+
+            if result.returncode == 0:
+                logger.info(f"Successfully finished {script_name}")
+            else:
+                logger.error(f"Error running {script_name}, return code: {result.returncode}")
+
+                if is_critical:
+                    logger.critical(f"Critical script {script_name} failed - stopping pipeline")
+                    success = False
+                    break
+                else:
+                    logger.warning(f"Non-critical script {script_name} failed - continuing with next script")
+
+        except Exception as e:
+            logger.error(f"Exception while running {script_name}: {e}")
+
             if is_critical:
                 logger.critical(f"Critical script {script_name} failed - stopping pipeline")
                 success = False
                 break
             else:
                 logger.warning(f"Non-critical script {script_name} failed - continuing with next script")
-    
-    except Exception as e:
-        logger.error(f"Exception while running {script_name}: {e}")
-        
-        if is_critical:
-            logger.critical(f"Critical script {script_name} failed - stopping pipeline")
-            success = False
-            break
-        else:
-            logger.warning(f"Non-critical script {script_name} failed - continuing with next script")
-
-if success:
-    logger.info("All critical scripts completed successfully")
-    sys.exit(0)
-else:
-    logger.error("Pipeline failed due to critical script failure")
-    sys.exit(1)
\ No newline at end of file
+
+    return success
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Run the fetch, clean and infer stages of the pipeline')
+    parser.add_argument('--mode', choices=['in-process', 'subprocess'], default='in-process',
+                        help='Run stages in this process and pass data in memory, or run each script separately')
+    parser.add_argument('--max_parallel', type=int, default=max_parallel_stages,
+                        help='In-process mode: how many independent stages may run at the same time')
+    args = parser.parse_args()
+
+    if args.mode == 'subprocess':
+        success = run_subprocess_pipeline(python_scripts)
+    else:
+        success = run_in_process_pipeline(pipeline_stages, args.max_parallel)
+
+    if success:
+        logger.info("All critical scripts completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Pipeline failed due to critical script failure")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
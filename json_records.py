@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Python types the JSON encoder takes as-is
+_JSON_NATIVE_TYPES = (str, int, float, bool, list, dict, type(None))
+
+
+def _json_safe_value(value):
+    # Fallback for odd cells in object columns (numpy scalars, timestamps, NA markers)
+    if value is None or isinstance(value, (list, dict, str, bool)):
+        return value
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        ts = pd.Timestamp(value)
+        return None if pd.isna(ts) else ts.strftime('%Y-%m-%d')
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, int):
+        return value
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return value
+
+
+def json_safe_column(column: pd.Series) -> list:
+    """Convert one column to a list of JSON-ready Python values, choosing the conversion once by dtype"""
+    dtype = column.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        # Dates are stored as ISO dates; NaT becomes None
+        dates = column.dt.strftime('%Y-%m-%d')
+        return dates.astype(object).where(column.notna(), None).tolist()
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        # numpy and nullable Int64/boolean columns; tolist() yields Python ints/bools and NA -> None
+        if isinstance(dtype, np.dtype):
+            return column.tolist()
+        return column.astype(object).where(column.notna(), None).tolist()
+    if pd.api.types.is_float_dtype(dtype):
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isfinite(values), values, None).tolist()
+
+    # Object and string columns: null out missing values, and only walk cells one by one
+    # when something besides plain JSON types is in there
+    values = column.astype(object).tolist()
+    missing = column.isna().to_numpy()
+    if missing.any():
+        values = [None if is_missing else value for value, is_missing in zip(values, missing)]
+    types = set(map(type, values))
+    if not types <= set(_JSON_NATIVE_TYPES):
+        values = [_json_safe_value(value) for value in values]
+    elif float in types:
+        values = [None if isinstance(value, float) and not np.isfinite(value) else value for value in values]
+    return values
+
+
+def json_safe_records(df: pd.DataFrame) -> list:
+    """Rows of df as JSON-ready dicts for an upsert payload"""
+    columns = [json_safe_column(df[column]) for column in df.columns]
+    keys = [str(column) for column in df.columns]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def encode_records(records: list) -> bytes:
+    """Compact JSON body for a batch of records"""
+    return json.dumps(records, separators=(',', ':'), allow_nan=False).encode('utf-8')
@@ -0,0 +1,77 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from near_duplicates import drop_near_duplicates, _shingles, _jaccard, MinHashLSH
+
+
+WORDS = ["solidity", "rust", "backend", "frontend", "protocol", "smart", "contract", "growth", "community",
+         "security", "research", "platform", "infrastructure", "product", "data", "defi", "wallet", "node"]
+ROLES = ["Engineer", "Developer", "Manager", "Designer", "Analyst", "Researcher", "Lead"]
+LEVELS = ["I", "II", "III", "Junior", "Senior", "Staff", "Principal"]
+
+
+def make_pairs(pairs: int, threshold: float, seed: int = 0) -> pd.DataFrame:
+    # Reposts whose title matches and whose company/location shingles put them just above the threshold
+    rng = np.random.default_rng(seed)
+    rows = []
+    while len(rows) < 2 * pairs:
+        title = " ".join(rng.choice(WORDS, size=rng.integers(1, 3))).title() + " " + rng.choice(ROLES)
+        company = f"Company {len(rows)} " + "".join(rng.choice(list("abcdefghij"), size=rng.integers(4, 10)))
+        location = "Remote - " + rng.choice(["USA", "Europe", "Germany", "Singapore", "Canada"])
+        edited = location + rng.choice([" Only", " (EST)", ", NY", " / EU", " Timezone"])
+        text = " | ".join([title, company, location])
+        jaccard = _jaccard(_shingles(text), _shingles(" | ".join([title, company, edited])))
+        if threshold <= jaccard < threshold + 0.08:
+            rows.append({"job_id": len(rows), "title": title, "company": company, "location": location})
+            rows.append({"job_id": len(rows), "title": title, "company": company, "location": edited})
+    return pd.DataFrame(rows)
+
+
+def make_levels(pairs: int, seed: int = 1) -> pd.DataFrame:
+    # Postings that differ only in a level suffix or seniority word and must both be kept
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(pairs):
+        role = " ".join(rng.choice(WORDS, size=2)).title() + " " + rng.choice(ROLES)
+        first, second = rng.choice(LEVELS, size=2, replace=False)
+        company = f"Level Company {i} " + "".join(rng.choice(list("abcdefghij"), size=8))
+        rows.append({"job_id": 2 * i, "title": f"{role} {first}", "company": company, "location": "Remote - USA"})
+        rows.append({"job_id": 2 * i + 1, "title": f"{role} {second}", "company": company, "location": "Remote - USA"})
+    return pd.DataFrame(rows)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Check that near-duplicate detection catches pairs just above the threshold')
+    parser.add_argument('--pairs', type=int, default=500, help='Generated near-duplicate pairs')
+    parser.add_argument('--threshold', type=float, default=0.85, help='Jaccard threshold to check')
+    args = parser.parse_args()
+
+    df = make_pairs(args.pairs, args.threshold)
+    started = time.perf_counter()
+    deduped, audit = drop_near_duplicates(df, args.threshold)
+    elapsed = time.perf_counter() - started
+
+    caught = len(audit)
+    assert caught == args.pairs, f"only {caught} of {args.pairs} pairs above the threshold were dropped"
+    assert (audit["duplicate_of_job_id"] == audit["job_id"] - 1).all(), "a duplicate was merged into the wrong row"
+    texts = df[["title", "company", "location"]].astype(str).agg(" | ".join, axis=1)
+    for job_id, original, jaccard in audit[["job_id", "duplicate_of_job_id", "jaccard"]].itertuples(index=False):
+        exact = _jaccard(_shingles(texts[job_id]), _shingles(texts[original]))
+        assert jaccard == round(exact, 3), "audit score is not the score of the merged pair"
+
+    levels = make_levels(args.pairs)
+    _, level_audit = drop_near_duplicates(levels, args.threshold)
+    assert level_audit.empty, f"{len(level_audit)} postings differing only in level were merged"
+
+    lsh = MinHashLSH(args.threshold)
+    print(f"Threshold: {args.threshold}, LSH shape: {lsh.bands} bands x {lsh.rows} rows")
+    print(f"Pairs just above the threshold caught: {caught}/{args.pairs} in {elapsed:.3f}s")
+    print(f"Level-only pairs merged: {len(level_audit)}/{args.pairs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,13 @@ import json
 import pandas as pd
 import os
 from datetime import datetime
+import sys
+import argparse
+from near_duplicates import drop_near_duplicates
+# Helpers shared with the infer scripts live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_records import json_safe_records
+from bulk_writer import BulkWriter
 import ast
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -13,6 +20,10 @@ load_dotenv()
 url= os.getenv('SUPABASE_URL')
 key= os.getenv('SUPABASE_KEY')
 supabase: Client = create_client(url, key)
+bulk_writer = BulkWriter(url, key)
+
+# Jaccard similarity of title/company/location shingles above which reposts are merged
+NEAR_DUPLICATE_THRESHOLD = 0.85
 
 
 def clean_salary_columns(df):
@@ -103,7 +114,7 @@ def clean_date(df):
     return df
 
 
-def clean_job_data(df):
+def clean_job_data(df, near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD, return_audit=False):
     df = clean_skills(df)
     df = clean_salary_columns(df)
     df = clean_date(df)
@@ -115,6 +126,12 @@ def clean_job_data(df):
 
     df = df.drop_duplicates(subset=['job_id','company'])
 
+    # Drop reposts of the same role under new IDs
+    df, audit = drop_near_duplicates(df, near_duplicate_threshold)
+    print(f"Dropped {len(audit)} near-duplicate jobs (Jaccard >= {near_duplicate_threshold})")
+    if not audit.empty:
+        print(audit.to_string(index=False))
+
     # Select columns and handle any potential problematic values
     df = df[['title', 'company', 'location', 'salary_amount', 'skills', 'source', 'job_url', 
              'job_id', 'posted_datetime', 'is_remote', 'ingestion_date']]
@@ -123,10 +140,46 @@ def clean_job_data(df):
     df = df.replace([np.inf, -np.inf], None)
     df = df.where(pd.notnull(df), None)
     
+    if return_audit:
+        return df, audit
+    return df
+
+def clean_and_upload_jobs(jobs: list, skip_unchanged: bool = False) -> pd.DataFrame:
+    """Clean raw cryptojobs.com jobs, archive the near-duplicate audit and upsert the result"""
+    df = pd.DataFrame(jobs)
+    df, audit = clean_job_data(df, return_audit=True)
+
+    # Keep the near-duplicate audit table next to the raw file
+    if not audit.empty:
+        audit_filename = 'cryptojobscom-near-duplicates.json' + datetime.now().strftime('%Y-%m-%d')
+        try:
+            supabase.storage.from_('jobs-raw').upload(
+                audit_filename,
+                audit.to_json(orient='records').encode('utf-8'),
+                {'upsert': 'true'}
+            )
+            print(f"Uploaded near-duplicate audit table to {audit_filename}")
+        except Exception as e:
+            print(f"Error uploading near-duplicate audit table: {e}")
+    
+    # Upload to Supabase with cleaned records
+    records = json_safe_records(df)
+    if skip_unchanged:
+        bulk_writer.upsert_changed("cryptojobscom", records, key_column="job_url")
+    else:
+        bulk_writer.upsert("cryptojobscom", records)
+    print("Uploaded to Supabase")
+
     return df
 
+
 def main():
 
+    parser = argparse.ArgumentParser(description='Clean the raw cryptojobs.com jobs and upload them')
+    parser.add_argument('--skip_unchanged', action='store_true',
+                        help='Only upsert jobs that are new or changed; unchanged jobs just get their ingestion_date refreshed')
+    args = parser.parse_args()
+
     filename = 'cryptojobscom.json' + datetime.now().strftime('%Y-%m-%d')
 
     response = supabase.storage.from_('jobs-raw').download(filename)
@@ -134,15 +187,7 @@ def main():
     
     print(f"Loaded {len(jobs)} jobs")
 
-    df = pd.DataFrame(jobs)
-    df = clean_job_data(df)
-    
-    # Convert DataFrame to dict 
-    records = df.to_dict(orient="records")
-
-    # Upload to Supabase with cleaned records
-    supabase.table("cryptojobscom").upsert(records).execute()
-    print("Uploaded to Supabase")
+    clean_and_upload_jobs(jobs, args.skip_unchanged)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
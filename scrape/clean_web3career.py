@@ -6,12 +6,23 @@ from supabase import create_client, Client
 from dotenv import load_dotenv
 import numpy as np
 from datetime import datetime
+import sys
+import argparse
+from near_duplicates import drop_near_duplicates
+# Helpers shared with the infer scripts live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_records import json_safe_records
+from bulk_writer import BulkWriter
 
 load_dotenv()
 
 url= os.getenv('SUPABASE_URL')
 key= os.getenv('SUPABASE_KEY')
 supabase: Client = create_client(url, key)
+bulk_writer = BulkWriter(url, key)
+
+# Jaccard similarity of title/company/location shingles above which reposts are merged
+NEAR_DUPLICATE_THRESHOLD = 0.85
 
 
 def clean_skills(df):
@@ -48,7 +59,7 @@ def clean_salary_columns(df):
     return df
 
 
-def clean_job_data(df):
+def clean_job_data(df, near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD, return_audit=False):
     df = clean_skills(df)
     df = clean_salary_columns(df)
     df['title'] = df['title'].str.replace('"', '', regex=False)
@@ -59,13 +70,57 @@ def clean_job_data(df):
 
     df = df.drop_duplicates(subset=['job_id','company'])
 
+    # Drop reposts of the same role under new IDs
+    df, audit = drop_near_duplicates(df, near_duplicate_threshold)
+    print(f"Dropped {len(audit)} near-duplicate jobs (Jaccard >= {near_duplicate_threshold})")
+    if not audit.empty:
+        print(audit.to_string(index=False))
+
     df = df[['title', 'company', 'location', 'salary_amount', 'skills', 'source', 'job_url', 
              'job_id', 'posted_datetime', 'is_remote', 'ingestion_date']]
+
+    if return_audit:
+        return df, audit
+    return df
+
+
+def clean_and_upload_jobs(jobs: list, skip_unchanged: bool = False) -> pd.DataFrame:
+    """Clean raw web3.career jobs, archive the near-duplicate audit and upsert the result"""
+    # Convert to pandas DataFrame
+    df = pd.DataFrame(jobs)
+    df, audit = clean_job_data(df, return_audit=True)
+
+    # Keep the near-duplicate audit table next to the raw file
+    if not audit.empty:
+        audit_filename = 'web3career-near-duplicates.json' + datetime.now().strftime('%Y-%m-%d')
+        try:
+            supabase.storage.from_('jobs-raw').upload(
+                audit_filename,
+                audit.to_json(orient='records').encode('utf-8'),
+                {'upsert': 'true'}
+            )
+            print(f"Uploaded near-duplicate audit table to {audit_filename}")
+        except Exception as e:
+            print(f"Error uploading near-duplicate audit table: {e}")
+
+    # Upload to Supabase
+    records = json_safe_records(df)
+    if skip_unchanged:
+        bulk_writer.upsert_changed("web3career", records, key_column="job_url")
+    else:
+        bulk_writer.upsert("web3career", records)
+    print("Uploaded to Supabase")
+
     return df
 
 
 def main():
 
+    parser = argparse.ArgumentParser(description='Clean the raw web3.career jobs and upload them')
+    parser.add_argument('--skip_unchanged', action='store_true',
+                        help='Only upsert jobs that are new or changed; unchanged jobs just get their ingestion_date refreshed')
+    args = parser.parse_args()
+
     filename = 'web3career.json' + datetime.now().strftime('%Y-%m-%d')
 
     response = supabase.storage.from_('jobs-raw').download(filename)
@@ -74,13 +129,7 @@ def main():
     
     print(f"Loaded {len(jobs)} jobs")
 
-    # Convert to pandas DataFrame
-    df = pd.DataFrame(jobs)
-    df = clean_job_data(df)
-
-    # Upload to Supabase
-    supabase.table("web3career").upsert(df.to_dict(orient="records")).execute()
-    print("Uploaded to Supabase")
+    clean_and_upload_jobs(jobs, args.skip_unchanged)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -248,36 +248,44 @@ class Web3CareerFetcher:
         self.driver.quit()
 
 
+def fetch_web3career_jobs(max_pages: int = 1, fetcher: Web3CareerFetcher = None) -> List[Dict]:
+    """Scrape up to max_pages of listings and archive the raw jobs in the jobs-raw bucket"""
+    fetcher = fetcher or Web3CareerFetcher()
+    try:
+        jobs = fetcher.fetch_jobs(max_pages)
+    finally:
+        fetcher.cleanup()
+
+    # Convert jobs to JSON string
+    jobs_json = json.dumps(jobs).encode('utf-8')
+
+    filename = 'web3career.json' + datetime.now().strftime('%Y-%m-%d')
+
+    # Upload to Supabase storage
+    try:
+        response = supabase.storage.from_('jobs-raw').upload(
+            filename,
+            jobs_json,
+            {'upsert': 'true'}
+        )
+        fetcher.logger.info(f"Successfully uploaded data to Supabase storage: {response}")
+    except Exception as upload_error:
+        fetcher.logger.error(f"Error uploading to Supabase: {upload_error}")
+
+    return jobs
+
+
 def main():
 
     parser = argparse.ArgumentParser(description='Fetch jobs from web3.career')
     parser.add_argument('--max_pages', type=int, default=1, help='Maximum number of pages to fetch')
     args = parser.parse_args()
-    
+
     fetcher = Web3CareerFetcher()
     try:
-        max_pages = args.max_pages
-        jobs = fetcher.fetch_jobs(max_pages)
-        # Convert jobs to JSON string
-        jobs_json = json.dumps(jobs).encode('utf-8')
-
-        filename = 'web3career.json' + datetime.now().strftime('%Y-%m-%d')
-        
-        # Upload to Supabase storage 
-        try:
-            response = supabase.storage.from_('jobs-raw').upload(
-                filename, 
-                jobs_json, 
-                {'upsert': 'true'}
-            )
-            fetcher.logger.info(f"Successfully uploaded data to Supabase storage: {response}")
-        except Exception as upload_error:
-            fetcher.logger.error(f"Error uploading to Supabase: {upload_error}")
-
+        fetch_web3career_jobs(args.max_pages, fetcher)
     except Exception as e:
         fetcher.logger.error(f"Error fetching jobs: {e}")
-    finally:
-        fetcher.cleanup()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+_PRIME = (1 << 31) - 1
+
+
+def _shingles(text: str, size: int = 4) -> set:
+    text = " ".join(text.lower().split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _jaccard(x: set, y: set) -> float:
+    return len(x & y) / len(x | y) if x or y else 1.0
+
+
+def _lsh_shape(num_perm: int, threshold: float, recall: float = 0.999):
+    """
+    Pick (bands, rows) with bands * rows <= num_perm so a pair at exactly the threshold becomes a
+    candidate with probability >= recall, using as many rows per band as possible to limit false candidates.
+    Pairs above the threshold collide with higher probability; exact Jaccard drops the false candidates.
+    """
+    for rows in range(num_perm, 0, -1):
+        for bands in range(1, num_perm // rows + 1):
+            if 1 - (1 - threshold ** rows) ** bands >= recall:
+                return bands, rows
+    return num_perm, 1
+
+
+class MinHashLSH:
+    """
+    MinHash signatures over character shingles, bucketed with banded LSH so only rows
+    that collide in at least one band are compared.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, seed: int = 1):
+        self.threshold = threshold
+        self.bands, self.rows = _lsh_shape(num_perm, threshold)
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=self.bands * self.rows, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=self.bands * self.rows, dtype=np.int64)
+
+    def signature(self, shingles: set) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _PRIME for s in shingles), dtype=np.int64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+    def candidate_pairs(self, signatures: np.ndarray) -> set:
+        pairs = set()
+        for band in range(self.bands):
+            band_slice = signatures[:, band * self.rows:(band + 1) * self.rows]
+            buckets = {}
+            for i, key in enumerate(map(bytes, band_slice)):
+                buckets.setdefault(key, []).append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+
+def drop_near_duplicates(df: pd.DataFrame, threshold: float = 0.85, columns=("title", "company", "location"),
+                         id_column: str = "job_id", num_perm: int = 128):
+    """
+    Drop rows whose title/company/location shingles have Jaccard similarity >= threshold with an
+    earlier kept row, and whose title words do too, so level suffixes like "II" vs "III" keep rows apart.
+    Returns the deduplicated frame and an audit table of merged IDs with the score of each merged pair.
+    """
+    audit_columns = [id_column, f"duplicate_of_{id_column}", "jaccard", "title", "company"]
+    if len(df) < 2:
+        return df, pd.DataFrame(columns=audit_columns)
+
+    texts = df[list(columns)].fillna("").astype(str).agg(" | ".join, axis=1)
+    shingle_sets = [_shingles(text) for text in texts]
+    title_words = [_words(title) for title in df["title"].fillna("").astype(str)]
+
+    lsh = MinHashLSH(threshold, num_perm)
+    signatures = np.vstack([lsh.signature(shingles) for shingles in shingle_sets])
+
+    # Verify LSH candidates with exact Jaccard on shingles and on title words
+    matches = {}
+    for i, j in lsh.candidate_pairs(signatures):
+        jaccard = _jaccard(shingle_sets[i], shingle_sets[j])
+        if jaccard >= threshold and _jaccard(title_words[i], title_words[j]) >= threshold:
+            matches.setdefault(max(i, j), []).append((min(i, j), jaccard))
+
+    # Each row is dropped only in favour of the earliest kept row it matches directly, so merges never chain
+    keep = np.ones(len(df), dtype=bool)
+    duplicates, originals, scores = [], [], []
+    for j in sorted(matches):
+        kept = [(i, jaccard) for i, jaccard in sorted(matches[j]) if keep[i]]
+        if kept:
+            keep[j] = False
+            duplicates.append(j)
+            originals.append(kept[0][0])
+            scores.append(round(kept[0][1], 3))
+
+    ids = df[id_column].values
+    audit = pd.DataFrame({
+        id_column: ids[duplicates],
+        f"duplicate_of_{id_column}": ids[originals],
+        "jaccard": scores,
+        "title": df["title"].values[duplicates],
+        "company": df["company"].values[duplicates],
+    }, columns=audit_columns)
+
+    return df.iloc[keep], audit